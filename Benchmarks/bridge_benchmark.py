@@ -0,0 +1,384 @@
+import argparse
+import io
+import json
+import os
+import platform
+import queue
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from Benchmarks import fixtures
+from Benchmarks.fake_services import FakeServices
+
+MAIN_SCRIPT = os.path.join(ROOT_DIR, "main.py")
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "Benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+
+class BridgeSession:
+    def __init__(self, python=None):
+        self.started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [python or sys.executable, "-u", MAIN_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=ROOT_DIR,
+            text=True,
+            encoding="utf-8",
+            bufsize=1
+        )
+        self.events = queue.Queue()
+        self.event_count = 0
+        self.reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self.reader.start()
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                payload = json.loads(line)
+            except Exception:
+                continue
+            self.events.put((time.perf_counter(), payload))
+        self.events.put((time.perf_counter(), None))
+
+    def send(self, payload):
+        self.proc.stdin.write(json.dumps(payload) + "\n")
+        self.proc.stdin.flush()
+        return time.perf_counter()
+
+    def wait_for(self, predicate, timeout=60.0):
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError("Bridge did not answer in time.")
+            stamp, payload = self.events.get(timeout=remaining)
+            if payload is None:
+                raise RuntimeError("Bridge exited unexpectedly.")
+            self.event_count += 1
+            if predicate(payload):
+                return stamp, payload
+
+    def peak_rss_bytes(self):
+        try:
+            with open(f"/proc/{self.proc.pid}/status", "r", encoding="ascii") as handle:
+                for line in handle:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except Exception:
+            pass
+        return None
+
+    def close(self):
+        peak = self.peak_rss_bytes()
+        try:
+            self.send({"command": "exit"})
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        if peak is None and sys.platform != "win32":
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            if sys.platform != "darwin":
+                peak *= 1024
+        return peak
+
+
+def _record(results, name, value, unit, better):
+    if value is None:
+        return
+    results[name] = {"value": round(float(value), 4), "unit": unit, "better": better}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    idx = min(len(ordered) - 1, max(0, int(round((pct / 100.0) * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _is_ready(payload):
+    return payload.get("type") == "ready"
+
+
+def _finished_for(task_id):
+    return lambda payload: payload.get("type") in ("finished", "metadata") and payload.get("id") == task_id
+
+
+def bench_startup(results, iterations):
+    samples = []
+    peaks = []
+    for _ in range(iterations):
+        session = BridgeSession()
+        stamp, _ = session.wait_for(_is_ready, timeout=120)
+        samples.append((stamp - session.started) * 1000.0)
+        peak = session.close()
+        if peak:
+            peaks.append(peak)
+    _record(results, "startup.ready_ms.p50", statistics.median(samples), "ms", "lower")
+    _record(results, "startup.ready_ms.max", max(samples), "ms", "lower")
+    if peaks:
+        _record(results, "startup.peak_rss_mb", max(peaks) / (1024 * 1024), "MB", "lower")
+
+
+def bench_dispatch(results, session, iterations):
+    sync_samples = []
+    task_samples = []
+    for idx in range(iterations):
+        sent = session.send({"command": "cancel", "id": f"bench-missing-{idx}"})
+        stamp, _ = session.wait_for(lambda p: p.get("type") == "error" and p.get("message") == "Task not found")
+        sync_samples.append((stamp - sent) * 1000.0)
+
+        task_id = f"bench-dispatch-{idx}"
+        sent = session.send({"command": "metadata_c", "id": task_id, "args": [os.path.join(ROOT_DIR, "__missing__")]})
+        stamp, _ = session.wait_for(_finished_for(task_id))
+        task_samples.append((stamp - sent) * 1000.0)
+    _record(results, "dispatch.sync_ms.p50", statistics.median(sync_samples), "ms", "lower")
+    _record(results, "dispatch.sync_ms.p95", _percentile(sync_samples, 95), "ms", "lower")
+    _record(results, "dispatch.task_ms.p50", statistics.median(task_samples), "ms", "lower")
+    _record(results, "dispatch.task_ms.p95", _percentile(task_samples, 95), "ms", "lower")
+
+
+class _CountingSink(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.lines = 0
+
+    def write(self, data):
+        self.lines += data.count("\n")
+        return len(data)
+
+
+def bench_rate_limited_stdout(results, event_count):
+    from main import RateLimitedStdout
+
+    sink = _CountingSink()
+    stream = RateLimitedStdout(sink, min_interval=0.4, throttled_types={"progress", "progress_ffmpeg", "log"})
+    lines = []
+    for idx in range(event_count):
+        task_id = f"task-{idx % 8}"
+        if idx % 10 == 0:
+            payload = {"type": "status", "id": task_id, "msg": "post-processing"}
+        elif idx % 3 == 0:
+            payload = {"type": "progress_ffmpeg", "id": task_id, "status": "processing", "frame": str(idx), "time": "00:00:01.00"}
+        else:
+            payload = {"type": "progress", "id": task_id, "percent": idx % 100, "status": "downloading"}
+        lines.append(json.dumps(payload) + "\n")
+    start = time.perf_counter()
+    for line in lines:
+        stream.write(line)
+    stream.flush()
+    elapsed = time.perf_counter() - start
+    _record(results, "stdout.events_per_s", event_count / elapsed if elapsed > 0 else None, "events/s", "higher")
+    _record(results, "stdout.forwarded_ratio", sink.lines / float(event_count), "ratio", "lower")
+
+
+def bench_resolvers(results, iterations):
+    from Download.spotify_resolver import resolve_spotify_for_metadata
+    from Download.deezer_resolver import resolve_deezer_for_metadata
+    from Download.apple_music_resolver import resolve_apple_music_for_metadata
+
+    cases = (
+        ("spotify", lambda idx: resolve_spotify_for_metadata(f"https://open.spotify.com/album/bench{idx:06d}")),
+        ("deezer", lambda idx: resolve_deezer_for_metadata(f"https://www.deezer.com/album/{100000 + idx}")),
+        ("apple_music", lambda idx: resolve_apple_music_for_metadata(f"https://music.apple.com/us/album/bench/{100000 + idx}")),
+    )
+    with FakeServices():
+        for name, resolve in cases:
+            samples = []
+            for idx in range(iterations):
+                start = time.perf_counter()
+                resolve(idx)
+                samples.append((time.perf_counter() - start) * 1000.0)
+            _record(results, f"resolver.{name}_ms.p50", statistics.median(samples), "ms", "lower")
+
+
+def _conversion_cases(work_dir, ffmpeg_path):
+    cases = []
+    tree_dir = fixtures.make_archive_tree(work_dir)
+    zip_path = fixtures.make_zip(work_dir, tree_dir)
+    tgz_path = fixtures.make_tar_gz(work_dir, tree_dir)
+    cases.append(("archive.zip_to_tar_gz", "convert", {"input_path": zip_path, "output_format": "tar.gz"}, "out.tar.gz"))
+    cases.append(("archive.tar_gz_to_zip", "convert", {"input_path": tgz_path, "output_format": "zip"}, "out.zip"))
+    cases.append(("archive.zip_to_7z", "convert", {"input_path": zip_path, "output_format": "7z"}, "out.7z"))
+
+    image_path = fixtures.make_image(work_dir)
+    if image_path:
+        cases.append(("image.png_to_jpg", "convert", {"input_path": image_path, "output_format": "jpg", "image_quality": 85}, "out.jpg"))
+        cases.append(("image.png_to_webp_1280", "convert", {"input_path": image_path, "output_format": "webp", "image_width": 1280}, "out.webp"))
+
+    font_path = fixtures.make_font(work_dir)
+    if font_path:
+        cases.append(("font.ttf_to_woff2", "convert", {"input_path": font_path, "output_format": "woff2"}, "out.woff2"))
+
+    video_path = fixtures.make_video(work_dir, ffmpeg_path)
+    if video_path:
+        out = os.path.join(work_dir, "out-video.mkv")
+        cases.append(("video.mp4_to_mkv", "convert", {
+            "input_path": video_path,
+            "output_format": "mkv",
+            "ffmpeg_path": ffmpeg_path,
+            "source_duration_seconds": 10,
+            "ffmpeg_args": ["-y", "-i", video_path, "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "copy", out]
+        }, out))
+        out = os.path.join(work_dir, "out-compress.mp4")
+        cases.append(("compress.video_crf", "compress", {
+            "input_path": video_path,
+            "output_path": out,
+            "category": "video",
+            "ffmpeg_path": ffmpeg_path,
+            "source_duration_seconds": 10,
+            "ffmpeg_args": ["-y", "-i", video_path, "-c:v", "libx264", "-preset", "ultrafast", "-crf", "32", "-c:a", "copy", out]
+        }, out))
+
+    audio_path = fixtures.make_audio(work_dir, ffmpeg_path)
+    if audio_path:
+        out = os.path.join(work_dir, "out-audio.m4a")
+        cases.append(("audio.wav_to_m4a", "convert", {
+            "input_path": audio_path,
+            "output_format": "m4a",
+            "ffmpeg_path": ffmpeg_path,
+            "source_duration_seconds": 60,
+            "ffmpeg_args": ["-y", "-i", audio_path, "-c:a", "aac", "-b:a", "128k", out]
+        }, out))
+    return cases
+
+
+def bench_conversions(results, session, work_dir, ffmpeg_path, iterations):
+    for name, command, payload, output in _conversion_cases(work_dir, ffmpeg_path):
+        payload = dict(payload)
+        output_path = output if os.path.isabs(output) else os.path.join(work_dir, "out", output)
+        payload.setdefault("output_path", output_path)
+        input_bytes = os.path.getsize(payload["input_path"])
+        samples = []
+        progress_events = 0
+        for idx in range(iterations):
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            task_id = f"bench-{name}-{idx}"
+            before = session.event_count
+            sent = session.send({"command": command, "id": task_id, "payload": payload})
+            stamp, finished = session.wait_for(_finished_for(task_id), timeout=600)
+            progress_events += session.event_count - before - 1
+            if not finished.get("success"):
+                print(f"  skipped {name}: {finished.get('error')}", file=sys.stderr)
+                samples = []
+                break
+            samples.append(stamp - sent)
+        if not samples:
+            continue
+        seconds = statistics.median(samples)
+        _record(results, f"convert.{name}.seconds", seconds, "s", "lower")
+        _record(results, f"convert.{name}.mb_per_s", (input_bytes / (1024 * 1024)) / seconds if seconds > 0 else None, "MB/s", "higher")
+        _record(results, f"convert.{name}.progress_events", progress_events / float(len(samples)), "events", "higher")
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if not base or not base.get("value"):
+            print(f"{name:48s} {current['value']:>12} {current['unit']:8s} (no baseline)")
+            continue
+        ratio = current["value"] / base["value"]
+        if current["better"] == "lower":
+            regressed = ratio > (1.0 + tolerance)
+        else:
+            regressed = ratio < (1.0 - tolerance)
+        marker = "REGRESSION" if regressed else "ok"
+        print(f"{name:48s} {current['value']:>12} {current['unit']:8s} baseline {base['value']:>12} x{ratio:.2f} {marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def run(options):
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="pulsar-bench-")
+    try:
+        print("startup...", file=sys.stderr)
+        bench_startup(results, options.startup_iterations)
+        print("stdout throttling...", file=sys.stderr)
+        bench_rate_limited_stdout(results, options.events)
+        print("resolvers...", file=sys.stderr)
+        bench_resolvers(results, options.iterations)
+
+        session = BridgeSession()
+        session.wait_for(_is_ready, timeout=120)
+        try:
+            print("dispatch...", file=sys.stderr)
+            bench_dispatch(results, session, options.dispatch_iterations)
+            print("conversions...", file=sys.stderr)
+            os.makedirs(os.path.join(work_dir, "out"), exist_ok=True)
+            bench_conversions(results, session, work_dir, options.ffmpeg, options.iterations)
+        finally:
+            peak = session.close()
+        if peak:
+            _record(results, "session.peak_rss_mb", peak / (1024 * 1024), "MB", "lower")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Pulsar bridge protocol and handlers.")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--startup-iterations", type=int, default=5)
+    parser.add_argument("--dispatch-iterations", type=int, default=200)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output")
+    options = parser.parse_args()
+
+    results = run(options)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "metrics": results
+    }
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Baseline written to {options.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.isfile(options.baseline):
+        with open(options.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle).get("metrics", {})
+    regressions = compare_with_baseline(results, baseline, options.tolerance)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed beyond {options.tolerance:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import json
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_HOSTS = {
+    "open.spotify.com",
+    "api.deezer.com",
+    "itunes.apple.com",
+    "embed.music.apple.com",
+}
+
+_TRACKS_PER_COLLECTION = 25
+_DEEZER_PAGE_SIZE = 10
+
+
+def _spotify_entity(item_type, item_id):
+    if item_type == "track":
+        return {
+            "type": "track",
+            "name": f"Bench Track {item_id}",
+            "uri": f"spotify:track:{item_id}",
+            "duration": 215000,
+            "artists": [{"name": "Bench Artist"}],
+            "coverArt": {"sources": [{"url": "https://example.invalid/cover.jpg", "width": 640, "height": 640}]}
+        }
+    return {
+        "type": item_type,
+        "name": f"Bench {item_type.title()} {item_id}",
+        "subtitle": "Bench Artist",
+        "relatedEntityUri": "spotify:artist:bench",
+        "trackList": [
+            {
+                "title": f"Bench Track {idx}",
+                "subtitle": "Bench Artist",
+                "duration": 180000 + idx,
+                "uri": f"spotify:track:{item_id}{idx:04d}"
+            }
+            for idx in range(_TRACKS_PER_COLLECTION)
+        ]
+    }
+
+
+def _spotify_embed_html(item_type, item_id):
+    next_data = {"props": {"pageProps": {"state": {"data": {"entity": _spotify_entity(item_type, item_id)}}}}}
+    return (
+        "<!DOCTYPE html><html><head></head><body>"
+        '<script id="__NEXT_DATA__" type="application/json">'
+        + json.dumps(next_data)
+        + "</script></body></html>"
+    )
+
+
+def _deezer_track(idx):
+    return {
+        "id": idx,
+        "title": f"Bench Track {idx}",
+        "duration": 200 + idx,
+        "link": f"https://www.deezer.com/track/{idx}",
+        "artist": {"name": "Bench Artist", "link": "https://www.deezer.com/artist/1"},
+        "album": {"cover_xl": "https://example.invalid/cover.jpg"}
+    }
+
+
+def _deezer_response(parts, query):
+    if len(parts) < 2:
+        return None
+    item_type, item_id = parts[0], parts[1]
+    if item_type == "track":
+        return _deezer_track(int(item_id) if item_id.isdigit() else 1)
+    if item_type not in ("album", "playlist"):
+        return None
+    if len(parts) >= 3 and parts[2] == "tracks":
+        index = int(query.get("index", ["0"])[0] or 0)
+        batch = [_deezer_track(i) for i in range(index, min(index + _DEEZER_PAGE_SIZE, _TRACKS_PER_COLLECTION))]
+        payload = {"data": batch, "total": _TRACKS_PER_COLLECTION}
+        next_index = index + _DEEZER_PAGE_SIZE
+        if next_index < _TRACKS_PER_COLLECTION:
+            payload["next"] = f"https://api.deezer.com/{item_type}/{item_id}/tracks?index={next_index}"
+        return payload
+    payload = {
+        "id": item_id,
+        "title": f"Bench {item_type.title()} {item_id}",
+        "nb_tracks": _TRACKS_PER_COLLECTION,
+        "tracks": {"data": [_deezer_track(i) for i in range(_DEEZER_PAGE_SIZE)]},
+        "tracklist": f"https://api.deezer.com/{item_type}/{item_id}/tracks?index=0",
+        "cover_xl": "https://example.invalid/cover.jpg",
+        "picture_xl": "https://example.invalid/cover.jpg"
+    }
+    if item_type == "album":
+        payload["artist"] = {"name": "Bench Artist", "link": "https://www.deezer.com/artist/1"}
+    else:
+        payload["creator"] = {"name": "Bench Curator", "link": "https://www.deezer.com/profile/1"}
+    return payload
+
+
+def _itunes_lookup(query):
+    item_id = query.get("id", ["1"])[0]
+    tracks = [
+        {
+            "wrapperType": "track",
+            "trackName": f"Bench Track {idx}",
+            "artistName": "Bench Artist",
+            "trackTimeMillis": 190000 + idx,
+            "trackViewUrl": f"https://music.apple.com/us/song/{item_id}{idx}",
+            "artworkUrl100": "https://example.invalid/100x100bb.jpg"
+        }
+        for idx in range(_TRACKS_PER_COLLECTION if query.get("entity") else 1)
+    ]
+    results = tracks
+    if query.get("entity"):
+        collection = {
+            "wrapperType": "collection",
+            "collectionName": f"Bench Album {item_id}",
+            "artistName": "Bench Artist",
+            "artworkUrl100": "https://example.invalid/100x100bb.jpg"
+        }
+        results = [collection] + tracks
+    return {"resultCount": len(results), "results": results}
+
+
+class _FakeServiceHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        query = urllib.parse.parse_qs(parsed.query)
+        if not parts:
+            self._send(404, "{}", "application/json")
+            return
+        host, parts = parts[0], parts[1:]
+
+        if host == "open.spotify.com":
+            if parts and parts[0] == "oembed":
+                body = {"title": "Bench Title", "author_name": "Bench Artist", "thumbnail_url": "https://example.invalid/thumb.jpg"}
+                self._send(200, json.dumps(body), "application/json")
+                return
+            if len(parts) >= 3 and parts[0] == "embed":
+                self._send(200, _spotify_embed_html(parts[1], parts[2]), "text/html")
+                return
+        elif host == "api.deezer.com":
+            body = _deezer_response(parts, query)
+            if body is not None:
+                self._send(200, json.dumps(body), "application/json")
+                return
+        elif host == "itunes.apple.com" and parts and parts[0] == "lookup":
+            self._send(200, json.dumps(_itunes_lookup(query)), "application/json")
+            return
+        elif host == "embed.music.apple.com":
+            body = {"title": "Bench Title", "author_name": "Bench Artist"}
+            self._send(200, json.dumps(body), "application/json")
+            return
+
+        self._send(404, "{}", "application/json")
+
+
+class _LocalRedirectHandler(urllib.request.BaseHandler):
+    handler_order = 100
+
+    def __init__(self, port, hosts):
+        self.port = port
+        self.hosts = set(hosts)
+
+    def _rewrite(self, req):
+        parsed = urllib.parse.urlparse(req.full_url)
+        if (parsed.hostname or "").lower() in self.hosts:
+            path = parsed.path or "/"
+            rewritten = f"http://127.0.0.1:{self.port}/{parsed.hostname}{path}"
+            if parsed.query:
+                rewritten += "?" + parsed.query
+            req.full_url = rewritten
+        return req
+
+    http_request = _rewrite
+    https_request = _rewrite
+
+
+class FakeServices:
+    def __init__(self, hosts=None):
+        self.hosts = set(hosts or FAKE_HOSTS)
+        self.server = None
+        self.thread = None
+        self.previous_opener = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1] if self.server else None
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeServiceHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.previous_opener = urllib.request._opener
+        urllib.request.install_opener(urllib.request.build_opener(_LocalRedirectHandler(self.port, self.hosts)))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        urllib.request.install_opener(self.previous_opener)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(timeout=2)
+        return False
@@ -0,0 +1,137 @@
+import os
+import random
+import subprocess
+import tarfile
+import zipfile
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+try:
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+except Exception:
+    FontBuilder = None
+    TTGlyphPen = None
+
+_SEED = 20240601
+
+
+def _random_bytes(rng, size):
+    return rng.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+
+def _text_bytes(rng, size):
+    words = [b"pulsar", b"bridge", b"archive", b"member", b"benchmark", b"stream", b"codec", b"frame"]
+    out = bytearray()
+    while len(out) < size:
+        out += rng.choice(words) + b" "
+    return bytes(out[:size])
+
+
+def make_archive_tree(work_dir, file_count=48, file_size=512 * 1024):
+    rng = random.Random(_SEED)
+    tree_dir = os.path.join(work_dir, "tree")
+    os.makedirs(tree_dir, exist_ok=True)
+    for idx in range(file_count):
+        sub = os.path.join(tree_dir, f"dir{idx % 4}")
+        os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f"file{idx:03d}.bin" if idx % 2 else f"file{idx:03d}.txt")
+        data = _random_bytes(rng, file_size) if idx % 2 else _text_bytes(rng, file_size)
+        with open(path, "wb") as handle:
+            handle.write(data)
+    return tree_dir
+
+
+def make_zip(work_dir, tree_dir):
+    path = os.path.join(work_dir, "fixture.zip")
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for root, _, names in os.walk(tree_dir):
+            for name in sorted(names):
+                full = os.path.join(root, name)
+                zf.write(full, os.path.relpath(full, tree_dir).replace("\\", "/"))
+    return path
+
+
+def make_tar_gz(work_dir, tree_dir):
+    path = os.path.join(work_dir, "fixture.tar.gz")
+    with tarfile.open(path, "w:gz") as tf:
+        tf.add(tree_dir, arcname=".")
+    return path
+
+
+def make_image(work_dir, size=(3000, 2000)):
+    if not Image:
+        return None
+    rng = random.Random(_SEED)
+    path = os.path.join(work_dir, "fixture.png")
+    width, height = size
+    base = Image.linear_gradient("L").resize(size)
+    noise = Image.frombytes("L", size, _random_bytes(rng, width * height))
+    img = Image.merge("RGB", (base, noise, base.rotate(90, expand=False)))
+    img.save(path, format="PNG")
+    return path
+
+
+def make_font(work_dir, glyph_count=400):
+    if not FontBuilder or not TTGlyphPen:
+        return None
+    path = os.path.join(work_dir, "fixture.ttf")
+    names = [".notdef"] + [f"glyph{idx}" for idx in range(glyph_count)]
+    glyphs = {}
+    for idx, name in enumerate(names):
+        pen = TTGlyphPen(None)
+        step = 10 + (idx % 50)
+        pen.moveTo((0, 0))
+        pen.lineTo((0, 500 + step))
+        pen.lineTo((400 + step, 500 + step))
+        pen.lineTo((400 + step, 0))
+        pen.closePath()
+        glyphs[name] = pen.glyph()
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({0x4E00 + idx: name for idx, name in enumerate(names[1:])})
+    fb.setupGlyf(glyphs)
+    fb.setupHorizontalMetrics({name: (600, 0) for name in names})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": "PulsarBench", "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.save(path)
+    return path
+
+
+def _run_ffmpeg(ffmpeg_path, args):
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"] + args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    return result.returncode == 0
+
+
+def make_video(work_dir, ffmpeg_path, seconds=10):
+    if not ffmpeg_path:
+        return None
+    path = os.path.join(work_dir, "fixture.mp4")
+    ok = _run_ffmpeg(ffmpeg_path, [
+        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", path
+    ])
+    return path if ok else None
+
+
+def make_audio(work_dir, ffmpeg_path, seconds=60):
+    if not ffmpeg_path:
+        return None
+    path = os.path.join(work_dir, "fixture.wav")
+    ok = _run_ffmpeg(ffmpeg_path, [
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-ac", "2", path
+    ])
+    return path if ok else None
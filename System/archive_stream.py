@@ -0,0 +1,961 @@
+import io
+import os
+import posixpath
+import queue
+import shutil
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+import gzip
+import bz2
+import lzma
+
+try:
+    import py7zr
+except Exception:
+    py7zr = None
+
+try:
+    from py7zr.io import Py7zIO, WriterFactory
+except Exception:
+    Py7zIO = None
+    WriterFactory = None
+
+try:
+    import rarfile
+except Exception:
+    rarfile = None
+
+from System.parallel_compress import (
+    DEFLATE_BLOCK_SIZE, DEFLATE_DICT_SIZE, OrderedPipeline, ParallelCompressedWriter,
+    deflate_block, deflate_final_block
+)
+
+CHUNK_SIZE = 1024 * 1024
+PIPE_MAX_CHUNKS = 8
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+
+_SINGLE_OPENERS = {
+    "gz": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+ARCHIVE_CODECS = ("auto", "stored", "deflate", "bzip2", "lzma", "zstd")
+
+ARCHIVE_CODEC_ALIASES = {
+    "store": "stored",
+    "none": "stored",
+    "deflated": "deflate",
+    "bz2": "bzip2",
+    "xz": "lzma",
+    "lzma2": "lzma",
+    "zstandard": "zstd",
+}
+
+ZIP_CODECS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+if getattr(zipfile, "ZIP_ZSTANDARD", None) is not None:
+    ZIP_CODECS["zstd"] = zipfile.ZIP_ZSTANDARD
+
+_SEVEN_ZIP_FILTERS = {
+    "stored": "FILTER_COPY",
+    "deflate": "FILTER_DEFLATE",
+    "bzip2": "FILTER_BZIP2",
+    "lzma": "FILTER_LZMA2",
+    "zstd": "FILTER_ZSTD",
+}
+
+ALREADY_COMPRESSED_EXTENSIONS = {
+    "jpg", "jpeg", "jfif", "png", "gif", "webp", "heic", "heif", "avif", "jxl",
+    "mp4", "m4v", "mkv", "webm", "mov", "avi", "wmv", "flv",
+    "mp3", "aac", "m4a", "ogg", "oga", "opus", "flac", "wma",
+    "zip", "7z", "rar", "gz", "tgz", "bz2", "tbz2", "xz", "txz", "zst", "lz4", "br",
+    "woff", "woff2", "docx", "xlsx", "pptx", "odt", "ods", "odp", "epub", "jar", "apk"
+}
+
+
+def is_already_compressed(name):
+    _, ext = os.path.splitext(str(name or "").lower())
+    return ext.lstrip(".") in ALREADY_COMPRESSED_EXTENSIONS
+
+
+def _clamp_level(level, low, high):
+    if level is None:
+        return None
+    return max(low, min(high, int(level)))
+
+
+def _single_level_kwargs(fmt, level):
+    if level is None:
+        return {}
+    if fmt == "gz":
+        return {"compresslevel": _clamp_level(level, 0, 9)}
+    if fmt == "bz2":
+        return {"compresslevel": _clamp_level(level, 1, 9)}
+    if fmt == "xz":
+        return {"preset": _clamp_level(level, 0, 9)}
+    return {}
+
+
+def normalize_member_name(name):
+    if not name:
+        return None
+    raw = str(name).replace("\\", "/")
+    if raw.startswith("/") or (len(raw) > 1 and raw[1] == ":"):
+        return None
+    normalized = posixpath.normpath(raw)
+    if normalized in (".", "") or normalized == ".." or normalized.startswith("../"):
+        return None
+    return normalized
+
+
+def copy_stream(src, dst, on_chunk=None, chunk_size=CHUNK_SIZE):
+    total = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(chunk)
+        total += len(chunk)
+        if on_chunk:
+            on_chunk(len(chunk))
+    return total
+
+
+class ArchiveMember:
+    def __init__(self, name, size, mtime=None, mode=None, opener=None, zip_info=None, raw_opener=None):
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode
+        self.zip_info = zip_info
+        self._opener = opener
+        self._raw_opener = raw_opener
+
+    def open(self):
+        return self._opener()
+
+    def open_raw(self):
+        if self._raw_opener is None:
+            return None
+        return self._raw_opener()
+
+
+class _CountingReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.position += len(data)
+        return data
+
+    def close(self):
+        self.raw.close()
+
+
+class _LimitedReader:
+    def __init__(self, raw, remaining):
+        self.raw = raw
+        self.remaining = remaining
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.raw.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.remaining = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _ProgressReader:
+    def __init__(self, raw, on_chunk):
+        self.raw = raw
+        self.on_chunk = on_chunk
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if data and self.on_chunk:
+            self.on_chunk(len(data))
+        return data
+
+
+class _ProgressBytesIO(io.BytesIO):
+    on_chunk = None
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if data and self.on_chunk:
+            self.on_chunk(len(data))
+        return data
+
+    def read1(self, size=-1):
+        data = super().read1(size)
+        if data and self.on_chunk:
+            self.on_chunk(len(data))
+        return data
+
+    def readinto(self, buffer):
+        count = super().readinto(buffer)
+        if count and self.on_chunk:
+            self.on_chunk(count)
+        return count
+
+
+class _ProgressFileReader(io.BufferedReader):
+    on_chunk = None
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if data and self.on_chunk:
+            self.on_chunk(len(data))
+        return data
+
+    def read1(self, size=-1):
+        data = super().read1(size)
+        if data and self.on_chunk:
+            self.on_chunk(len(data))
+        return data
+
+    def readinto(self, buffer):
+        count = super().readinto(buffer)
+        if count and self.on_chunk:
+            self.on_chunk(count)
+        return count
+
+
+class ZipSource:
+    def __init__(self, path):
+        self.path = path
+        self.zf = None
+        self.raw_handle = None
+        self.total = 0
+
+    def __enter__(self):
+        self.zf = zipfile.ZipFile(self.path)
+        self.total = sum(info.file_size for info in self.zf.infolist())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.raw_handle is not None:
+                self.raw_handle.close()
+        finally:
+            self.zf.close()
+        return False
+
+    def _open_raw(self, info):
+        if self.raw_handle is None:
+            self.raw_handle = open(self.path, "rb")
+        self.raw_handle.seek(info.header_offset)
+        header = self.raw_handle.read(30)
+        if len(header) != 30 or header[:4] != b"PK\x03\x04":
+            raise Exception("Bad zip member header.")
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        self.raw_handle.seek(info.header_offset + 30 + name_len + extra_len)
+        return _LimitedReader(self.raw_handle, info.compress_size)
+
+    def members(self):
+        for info in self.zf.infolist():
+            if info.is_dir():
+                continue
+            name = normalize_member_name(info.filename)
+            if not name:
+                continue
+            try:
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+            except Exception:
+                mtime = None
+            mode = (info.external_attr >> 16) & 0o7777 or None
+            yield ArchiveMember(
+                name, info.file_size, mtime, mode,
+                opener=lambda info=info: self.zf.open(info),
+                zip_info=info,
+                raw_opener=lambda info=info: self._open_raw(info)
+            )
+
+    def progress(self, done):
+        return done, self.total
+
+
+class TarSource:
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode.replace(":", "|", 1)
+        self.raw = None
+        self.tf = None
+        self.total = 0
+
+    def __enter__(self):
+        self.total = os.path.getsize(self.path)
+        self.raw = _CountingReader(open(self.path, "rb"))
+        self.tf = tarfile.open(fileobj=self.raw, mode=self.mode)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.tf.close()
+        finally:
+            self.raw.close()
+        return False
+
+    def members(self):
+        for member in self.tf:
+            if not member.isfile():
+                continue
+            name = normalize_member_name(member.name)
+            if not name:
+                continue
+            yield ArchiveMember(name, member.size, member.mtime, member.mode, lambda member=member: self.tf.extractfile(member))
+
+    def progress(self, done):
+        return self.raw.position, self.total
+
+
+class RarSource:
+    def __init__(self, path):
+        if not rarfile:
+            raise Exception("rarfile is not available.")
+        self.path = path
+        self.rf = None
+        self.total = 0
+
+    def __enter__(self):
+        self.rf = rarfile.RarFile(self.path)
+        self.total = sum(info.file_size for info in self.rf.infolist())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.rf.close()
+        return False
+
+    def members(self):
+        for info in self.rf.infolist():
+            if info.is_dir():
+                continue
+            name = normalize_member_name(info.filename)
+            if not name:
+                continue
+            mtime = None
+            if info.mtime:
+                mtime = info.mtime.timestamp()
+            yield ArchiveMember(name, info.file_size, mtime, None, lambda info=info: self.rf.open(info))
+
+    def progress(self, done):
+        return done, self.total
+
+
+class SingleFileSource:
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.raw = None
+        self.total = 0
+
+    def __enter__(self):
+        self.total = os.path.getsize(self.path)
+        self.raw = _CountingReader(open(self.path, "rb"))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.raw.close()
+        return False
+
+    def members(self):
+        name = os.path.basename(self.path)
+        suffix = f".{self.fmt}"
+        if name.lower().endswith(suffix):
+            name = name[: -len(suffix)]
+        opener = _SINGLE_OPENERS[self.fmt]
+        yield ArchiveMember(name or "payload", None, os.path.getmtime(self.path), None, lambda: opener(self.raw, "rb"))
+
+    def progress(self, done):
+        return self.raw.position, self.total
+
+
+class DirectorySource:
+    def __init__(self, path):
+        self.path = path
+        self.files = []
+        self.total = 0
+
+    def __enter__(self):
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                self.files.append(os.path.join(root, name))
+        self.total = sum(os.path.getsize(p) for p in self.files)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def members(self):
+        for full in self.files:
+            rel = os.path.relpath(full, self.path).replace("\\", "/")
+            stat = os.stat(full)
+            yield ArchiveMember(rel, stat.st_size, stat.st_mtime, stat.st_mode & 0o7777, lambda full=full: open(full, "rb"))
+
+    def progress(self, done):
+        return done, self.total
+
+
+class _MemberPipe:
+    def __init__(self, max_chunks=PIPE_MAX_CHUNKS):
+        self.queue = queue.Queue(max_chunks)
+        self.closed = False
+
+    def put(self, item):
+        while True:
+            if self.closed:
+                raise Exception("Archive stream closed.")
+            try:
+                self.queue.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def get(self):
+        while True:
+            try:
+                return self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+if Py7zIO is not None and WriterFactory is not None:
+    class _PipeWriter(Py7zIO):
+        def __init__(self, pipe):
+            self.pipe = pipe
+            self.length = 0
+
+        def write(self, s):
+            data = bytes(s)
+            if data:
+                self.pipe.put(("data", data))
+                self.length += len(data)
+            return len(data)
+
+        def read(self, size=None):
+            return b""
+
+        def seek(self, offset, whence=0):
+            return offset
+
+        def flush(self):
+            return None
+
+        def size(self):
+            return self.length
+
+    class _PipeWriterFactory(WriterFactory):
+        def __init__(self, pipe):
+            self.pipe = pipe
+
+        def create(self, filename):
+            self.pipe.put(("member", filename))
+            return _PipeWriter(self.pipe)
+
+
+class _PipedMemberStream:
+    def __init__(self, source):
+        self.source = source
+        self.buffer = b""
+        self.finished = False
+
+    def read(self, size=-1):
+        while not self.finished and (size is None or size < 0 or len(self.buffer) < size):
+            kind, value = self.source._next_item()
+            if kind == "data":
+                self.buffer += value
+                continue
+            self.source._pending = (kind, value)
+            self.finished = True
+        if size is None or size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        while not self.finished:
+            self.read(CHUNK_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+
+class SevenZipSource:
+    def __init__(self, path):
+        if not py7zr:
+            raise Exception("py7zr is not available.")
+        self.path = path
+        self.total = 0
+        self.entries = {}
+        self.pipe = None
+        self.thread = None
+        self._pending = None
+        self._fallback = None
+        self._temp_dir = None
+
+    def __enter__(self):
+        with py7zr.SevenZipFile(self.path, mode="r") as zf:
+            items = zf.list()
+        for item in items:
+            name = normalize_member_name(item.filename)
+            if not name:
+                raise Exception(f"Unsafe path in archive: {item.filename}")
+            if item.is_directory:
+                continue
+            self.entries[item.filename] = item
+        self.total = sum(item.uncompressed or 0 for item in self.entries.values())
+        if WriterFactory is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="pulsar-archive-")
+            with py7zr.SevenZipFile(self.path, mode="r") as zf:
+                zf.extractall(self._temp_dir)
+            self._fallback = DirectorySource(self._temp_dir).__enter__()
+            return self
+        self.pipe = _MemberPipe()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.pipe is not None:
+            self.pipe.close()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+        return False
+
+    def _produce(self):
+        try:
+            with open(self.path, "rb") as handle:
+                with py7zr.SevenZipFile(handle, mode="r") as zf:
+                    zf.extractall(factory=_PipeWriterFactory(self.pipe))
+            self.pipe.put(("done", None))
+        except BaseException as e:
+            try:
+                self.pipe.put(("error", e))
+            except Exception:
+                pass
+
+    def _next_item(self):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        return self.pipe.get()
+
+    def members(self):
+        if self._fallback is not None:
+            yield from self._fallback.members()
+            return
+        while True:
+            kind, value = self._next_item()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            if kind != "member":
+                continue
+            item = self.entries.get(value)
+            stream = _PipedMemberStream(self)
+            if item is None:
+                stream.close()
+                continue
+            mtime = None
+            if getattr(item, "creationtime", None):
+                try:
+                    mtime = item.creationtime.timestamp()
+                except Exception:
+                    mtime = None
+            yield ArchiveMember(normalize_member_name(value), item.uncompressed, mtime, None, lambda stream=stream: stream)
+            stream.close()
+
+    def progress(self, done):
+        return done, self.total
+
+
+def _zip_date_time(mtime):
+    stamp = time.localtime(mtime if mtime is not None else time.time())
+    if stamp.tm_year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return stamp[:6]
+
+
+def begin_raw_zip_member(zf, info, zip64):
+    with zf._lock:
+        zf.fp.seek(zf.start_dir)
+        info.header_offset = zf.fp.tell()
+        zf._writecheck(info)
+        zf._didModify = True
+        zf.fp.write(info.FileHeader(zip64))
+        zf.start_dir = zf.fp.tell()
+
+
+def write_raw_zip_data(zf, data):
+    with zf._lock:
+        zf.fp.write(data)
+        zf.start_dir = zf.fp.tell()
+    return len(data)
+
+
+def finish_raw_zip_member(zf, info, zip64):
+    with zf._lock:
+        end = zf.fp.tell()
+        zf.fp.seek(info.header_offset)
+        zf.fp.write(info.FileHeader(zip64))
+        zf.fp.seek(end)
+        zf.start_dir = end
+        zf.filelist.append(info)
+        zf.NameToInfo[info.filename] = info
+
+
+class _RawZipWriter:
+    def __init__(self, zf):
+        self.zf = zf
+
+    def write(self, data):
+        return write_raw_zip_data(self.zf, data)
+
+
+class ZipSink:
+    def __init__(self, path, threads=1, codec=None, level=None):
+        codec = codec or "deflate"
+        if codec != "auto" and codec not in ZIP_CODECS:
+            if codec == "zstd":
+                raise Exception("Zstandard compression is not available.")
+            raise Exception("Unsupported compression codec.")
+        self.path = path
+        self.threads = threads
+        self.codec = codec
+        self.level = level
+        self.zf = None
+        self.pipeline = None
+
+    def __enter__(self):
+        self.zf = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        if self.threads > 1:
+            self.pipeline = OrderedPipeline(self.threads)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.pipeline is not None:
+                if exc_type is None:
+                    self.pipeline.flush()
+                self.pipeline.close(cancel=exc_type is not None)
+        finally:
+            self.zf.close()
+        return False
+
+    def _resolve_compress_type(self, member):
+        if self.codec == "auto":
+            if is_already_compressed(member.name):
+                return zipfile.ZIP_STORED
+            return zipfile.ZIP_DEFLATED
+        return ZIP_CODECS[self.codec]
+
+    def _resolve_level(self, compress_type):
+        if self.level is None:
+            return None
+        if compress_type == zipfile.ZIP_DEFLATED:
+            return _clamp_level(self.level, 0, 9)
+        if compress_type == zipfile.ZIP_BZIP2:
+            return _clamp_level(self.level, 1, 9)
+        if compress_type == ZIP_CODECS.get("zstd"):
+            return _clamp_level(self.level, -7, 22)
+        return None
+
+    def _make_info(self, member):
+        info = zipfile.ZipInfo(member.name, date_time=_zip_date_time(member.mtime))
+        info.compress_type = self._resolve_compress_type(member)
+        level = self._resolve_level(info.compress_type)
+        if level is not None:
+            if hasattr(info, "compress_level"):
+                info.compress_level = level
+            else:
+                info._compresslevel = level
+        if member.mode:
+            info.external_attr = (member.mode & 0xFFFF) << 16
+        return info
+
+    def _can_copy_raw(self, member, compress_type):
+        source = member.zip_info
+        if source is None or self.level is not None:
+            return False
+        if source.flag_bits & 0x01:
+            return False
+        return source.compress_type == compress_type
+
+    def _add_raw(self, member, info, on_chunk):
+        source = member.zip_info
+        info.CRC = source.CRC
+        info.file_size = source.file_size
+        info.compress_size = source.compress_size
+        info.flag_bits |= source.flag_bits & 0x06
+        zip64 = info.file_size >= zipfile.ZIP64_LIMIT or info.compress_size >= zipfile.ZIP64_LIMIT
+        ratio = (info.file_size / info.compress_size) if info.compress_size else 1.0
+
+        def on_raw_chunk(size):
+            if on_chunk:
+                on_chunk(int(size * ratio))
+
+        if self.pipeline is not None:
+            self.pipeline.flush()
+        begin_raw_zip_member(self.zf, info, zip64)
+        with member.open_raw() as raw:
+            copy_stream(raw, _RawZipWriter(self.zf), on_raw_chunk)
+        finish_raw_zip_member(self.zf, info, zip64)
+
+    def add(self, member, stream, on_chunk=None):
+        info = self._make_info(member)
+        if self._can_copy_raw(member, info.compress_type):
+            self._add_raw(member, info, on_chunk)
+            return
+        force_zip64 = member.size is None or member.size >= zipfile.ZIP64_LIMIT
+        if self.pipeline is None or info.compress_type != zipfile.ZIP_DEFLATED:
+            if self.pipeline is not None:
+                self.pipeline.flush()
+            with self.zf.open(info, "w", force_zip64=force_zip64) as dst:
+                copy_stream(stream, dst, on_chunk)
+            return
+        self._add_parallel(info, stream, on_chunk, force_zip64 or member.size > zipfile.ZIP64_LIMIT // 2)
+
+    def _add_parallel(self, info, stream, on_chunk, zip64):
+        level = self._resolve_level(info.compress_type)
+        if level is None:
+            level = -1
+        state = {"crc": 0, "size": 0, "compressed": 0}
+
+        def begin(_):
+            info.CRC = 0
+            info.file_size = 0
+            info.compress_size = 0
+            begin_raw_zip_member(self.zf, info, zip64)
+
+        def write(data):
+            state["compressed"] += write_raw_zip_data(self.zf, data)
+
+        def finish(_):
+            write(deflate_final_block(level))
+            info.CRC = state["crc"]
+            info.file_size = state["size"]
+            info.compress_size = state["compressed"]
+            finish_raw_zip_member(self.zf, info, zip64)
+
+        self.pipeline.submit(begin)
+        tail = b""
+        while True:
+            data = stream.read(DEFLATE_BLOCK_SIZE)
+            if not data:
+                break
+            state["crc"] = zlib.crc32(data, state["crc"])
+            state["size"] += len(data)
+            if on_chunk:
+                on_chunk(len(data))
+            self.pipeline.submit(write, deflate_block, data, tail, level)
+            tail = data[-DEFLATE_DICT_SIZE:]
+        self.pipeline.submit(finish)
+
+
+class TarSink:
+    def __init__(self, path, mode, threads=1, level=None):
+        self.path = path
+        self.mode = mode
+        self.threads = threads
+        self.level = level
+        self.tf = None
+        self.writer = None
+
+    def __enter__(self):
+        fmt = self.mode.split(":", 1)[-1]
+        level_kwargs = _single_level_kwargs(fmt, self.level)
+        if self.threads > 1 and fmt in ("gz", "bz2", "xz"):
+            level = next(iter(level_kwargs.values()), None)
+            self.writer = ParallelCompressedWriter(self.path, fmt, self.threads, level=level)
+            self.tf = tarfile.open(fileobj=self.writer, mode="w|")
+        else:
+            self.tf = tarfile.open(self.path, self.mode, **level_kwargs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.tf.close()
+        finally:
+            if self.writer is not None:
+                if exc_type is None:
+                    self.writer.close()
+                else:
+                    self.writer.abort()
+        return False
+
+    def add(self, member, stream, on_chunk=None):
+        info = tarfile.TarInfo(member.name)
+        info.mtime = int(member.mtime if member.mtime is not None else time.time())
+        info.mode = member.mode or 0o644
+        if member.size is not None:
+            info.size = member.size
+            self.tf.addfile(info, _ProgressReader(stream, on_chunk))
+            return
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            info.size = copy_stream(stream, spool, on_chunk)
+            spool.seek(0)
+            self.tf.addfile(info, spool)
+
+
+class SevenZipSink:
+    def __init__(self, path, codec=None, level=None):
+        if not py7zr:
+            raise Exception("py7zr is not available.")
+        self.path = path
+        self.filters = self._build_filters(codec, level)
+        self.zf = None
+
+    @staticmethod
+    def _build_filters(codec, level):
+        if codec in (None, "auto"):
+            codec = "lzma"
+        if codec == "lzma" and level is None:
+            return None
+        filter_id = getattr(py7zr, _SEVEN_ZIP_FILTERS.get(codec, ""), None)
+        if filter_id is None:
+            raise Exception("Unsupported compression codec for 7z.")
+        entry = {"id": filter_id}
+        if codec == "lzma" and level is not None:
+            entry["preset"] = _clamp_level(level, 0, 9)
+        elif codec == "zstd" and level is not None:
+            entry["level"] = _clamp_level(level, 1, 22)
+        return [entry]
+
+    def __enter__(self):
+        if self.filters:
+            self.zf = py7zr.SevenZipFile(self.path, "w", filters=self.filters)
+        else:
+            self.zf = py7zr.SevenZipFile(self.path, "w")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.zf.close()
+        return False
+
+    def add(self, member, stream, on_chunk=None):
+        if member.size is not None and member.size <= SPOOL_MAX_MEMORY:
+            buffer = _ProgressBytesIO()
+            copy_stream(stream, buffer)
+            buffer.seek(0)
+            buffer.on_chunk = on_chunk
+            self.zf.writef(buffer, member.name)
+            return
+        handle, temp_path = tempfile.mkstemp(prefix="pulsar-member-")
+        try:
+            with os.fdopen(handle, "wb") as dst:
+                copy_stream(stream, dst)
+            with _ProgressFileReader(io.FileIO(temp_path, "rb"), CHUNK_SIZE) as reader:
+                reader.on_chunk = on_chunk
+                self.zf.writef(reader, member.name)
+        finally:
+            try:
+                os.remove(temp_path)
+            except Exception:
+                pass
+
+
+class SingleFileSink:
+    def __init__(self, path, fmt, threads=1, level=None):
+        self.path = path
+        self.fmt = fmt
+        self.threads = threads
+        self.level = level
+        self.handle = None
+        self.count = 0
+
+    def __enter__(self):
+        level_kwargs = _single_level_kwargs(self.fmt, self.level)
+        if self.threads > 1:
+            level = next(iter(level_kwargs.values()), None)
+            self.handle = ParallelCompressedWriter(self.path, self.fmt, self.threads, level=level)
+        else:
+            self.handle = _SINGLE_OPENERS[self.fmt](self.path, "wb", **level_kwargs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and isinstance(self.handle, ParallelCompressedWriter):
+            self.handle.abort()
+        else:
+            self.handle.close()
+        if exc_type is None and self.count != 1:
+            raise Exception("Single-file archive requires exactly one file.")
+        return False
+
+    def add(self, member, stream, on_chunk=None):
+        self.count += 1
+        if self.count > 1:
+            raise Exception("Single-file archive requires exactly one file.")
+        copy_stream(stream, self.handle, on_chunk)
+
+
+def transcode_compression_layer(input_path, input_compression, output_path, output_compression, threads=1, level=None, on_progress=None):
+    total = os.path.getsize(input_path)
+    with open(input_path, "rb") as handle:
+        raw = _CountingReader(handle)
+
+        def on_chunk(_):
+            if on_progress:
+                on_progress(raw.position, total)
+
+        if input_compression == output_compression and level is None:
+            with open(output_path, "wb") as dst:
+                copy_stream(raw, dst, on_chunk)
+            return
+
+        src = _SINGLE_OPENERS[input_compression](raw, "rb") if input_compression else raw
+        level_kwargs = _single_level_kwargs(output_compression, level)
+        if not output_compression:
+            dst = open(output_path, "wb")
+        elif threads > 1:
+            dst = ParallelCompressedWriter(output_path, output_compression, threads, level=next(iter(level_kwargs.values()), None))
+        else:
+            dst = _SINGLE_OPENERS[output_compression](output_path, "wb", **level_kwargs)
+        try:
+            copy_stream(src, dst, on_chunk)
+        except BaseException:
+            if isinstance(dst, ParallelCompressedWriter):
+                dst.abort()
+            else:
+                dst.close()
+            raise
+        dst.close()
@@ -1,18 +1,160 @@
 import json
 import os
+import shutil
+import tempfile
 import time
 
-from System.ffmpeg_runner import run_ffmpeg_with_progress
+from System.extensions import _detect_extension, _detect_category
+from System.ffmpeg_runner import FFmpegError, FFmpegStderr, SourceDuration, kill_ffmpeg_for_task, run_ffmpeg_with_progress
+from System.media_info import ffprobe_duration, ffprobe_media_info, probe_media_info, resolve_ffprobe_path
+from System.remux_planner import _split_args, plan_stream_copy
+from System.segment_transcode import SegmentTranscoder, can_segment, resolve_segment_count
 from System.utils import emit_json, ProgressEmitter, resolve_progress_percent
 
 _emit = emit_json
 _ProgressEmitter = ProgressEmitter
 _resolve_progress_percent = resolve_progress_percent
 
+DEFAULT_TWO_PASS_CODEC = "libx264"
+DEFAULT_TWO_PASS_AUDIO_BITRATE = 128000
+MIN_TWO_PASS_VIDEO_BITRATE = 32000
+TWO_PASS_CONTAINER_OVERHEAD = 0.02
+
+_TWO_PASS_DROPPED_OPTIONS = (
+    "-crf", "-cq", "-qp", "-q:v", "-qscale:v", "-b:v", "-maxrate", "-bufsize",
+    "-pass", "-passlogfile", "-x265-params", "-fs",
+)
+
 class CompressHandler:
     def __init__(self, task_id):
         self.task_id = task_id
 
+    @staticmethod
+    def _resolve_source_info(input_path, total_seconds, ffmpeg_path):
+        info = probe_media_info(input_path, _detect_extension(input_path)[0]) or {}
+        seconds = total_seconds or info.get("duration_seconds") or ffprobe_duration(
+            input_path, resolve_ffprobe_path(None, ffmpeg_path)
+        )
+        return seconds, info
+
+    @staticmethod
+    def _parse_bitrate(value):
+        raw = str(value or "").strip().lower()
+        scale = 1
+        if raw.endswith("k"):
+            raw, scale = raw[:-1], 1000
+        elif raw.endswith("m"):
+            raw, scale = raw[:-1], 1000 * 1000
+        try:
+            parsed = int(float(raw) * scale)
+        except Exception:
+            return None
+        return parsed if parsed > 0 else None
+
+    @staticmethod
+    def _probe_audio_bitrate(input_path, ffmpeg_path):
+        try:
+            info = ffprobe_media_info(input_path, resolve_ffprobe_path(None, ffmpeg_path))
+        except Exception:
+            return None
+        audio = next((stream for stream in info.get("streams") or [] if stream.get("type") == "audio"), None)
+        return (audio or {}).get("bitrate")
+
+    def _build_two_pass_args(self, ffmpeg_args, input_path, output_path, video_bitrate, passlog):
+        split = _split_args(ffmpeg_args, input_path, output_path)
+        if split is None:
+            raise Exception("target_size_bytes needs a single input after -i and the output path last in ffmpeg_args.")
+        pre, post = split
+        pre = [arg for arg in pre if arg not in ("-y", "-n")]
+        encode = []
+        x265_params = []
+        skip = False
+        for i, arg in enumerate(post):
+            if skip:
+                skip = False
+                continue
+            if arg in _TWO_PASS_DROPPED_OPTIONS:
+                if arg == "-x265-params" and i + 1 < len(post):
+                    x265_params = [
+                        param for param in post[i + 1].split(":")
+                        if param and param.split("=", 1)[0] not in ("pass", "stats")
+                    ]
+                skip = True
+                continue
+            encode.append(arg)
+        codec = None
+        for i, arg in enumerate(encode[:-1]):
+            if arg in ("-c:v", "-vcodec", "-codec:v"):
+                codec = encode[i + 1]
+        if codec is None:
+            codec = DEFAULT_TWO_PASS_CODEC
+            encode = ["-c:v", codec] + encode
+        if codec == "copy":
+            raise Exception("target_size_bytes cannot be combined with video stream copy.")
+        if not codec.startswith("lib"):
+            raise Exception(f"target_size_bytes needs a software encoder such as libx264 or libx265; {codec} does not support two-pass encoding.")
+        rate = ["-b:v", str(video_bitrate), "-maxrate", str(int(video_bitrate * 1.5)), "-bufsize", str(video_bitrate * 2)]
+
+        def pass_args(number):
+            if codec == "libx265":
+                stats = passlog.replace(":", "\\:")
+                return ["-x265-params", ":".join(x265_params + [f"pass={number}", f"stats={stats}.log"])]
+            return ["-pass", str(number), "-passlogfile", passlog]
+
+        first = ["-y"] + pre + ["-i", input_path] + encode + rate + pass_args(1) + ["-an", "-f", "null", os.devnull]
+        second = ["-y"] + pre + ["-i", input_path] + encode + rate + pass_args(2) + [output_path]
+        return first, second
+
+    def _run_two_pass(self, ffmpeg_path, ffmpeg_args, input_path, output_path, target_bytes, source_seconds, info, payload, progress):
+        if not source_seconds or source_seconds <= 0:
+            raise Exception("Could not determine the video duration for target_size_bytes.")
+        args = [str(arg) for arg in ffmpeg_args]
+        audio_copy = any(
+            arg in ("-c:a", "-acodec", "-codec:a") and value == "copy"
+            for arg, value in zip(args, args[1:])
+        )
+        audio_bitrate = 0
+        if "-an" not in args and (info.get("audio_codec") or not info.get("video_codec")):
+            if audio_copy:
+                audio_bitrate = self._probe_audio_bitrate(input_path, ffmpeg_path) or DEFAULT_TWO_PASS_AUDIO_BITRATE
+            else:
+                audio_bitrate = self._parse_bitrate(payload.get("audio_bitrate")) or DEFAULT_TWO_PASS_AUDIO_BITRATE
+                if "-b:a" in args[:-1]:
+                    audio_bitrate = self._parse_bitrate(args[args.index("-b:a") + 1]) or audio_bitrate
+        total_bitrate = int(target_bytes * 8 * (1 - TWO_PASS_CONTAINER_OVERHEAD) / source_seconds)
+        video_bitrate = total_bitrate - audio_bitrate
+        if video_bitrate < MIN_TWO_PASS_VIDEO_BITRATE:
+            raise Exception("Target size is too small for the length of this video.")
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix="pulsar-2pass-")
+        try:
+            first, second = self._build_two_pass_args(
+                ffmpeg_args, input_path, output_path, video_bitrate, os.path.join(temp_dir, "pass")
+            )
+            if audio_bitrate and not audio_copy and "-b:a" not in second:
+                second = second[:-1] + ["-b:a", str(audio_bitrate), second[-1]]
+            for index, args in enumerate((first, second)):
+                stderr_log = FFmpegStderr()
+                base = index * 50.0
+
+                def on_progress(data, base=base, stderr_log=stderr_log):
+                    percent, _ = _resolve_progress_percent(data, source_seconds)
+                    telemetry = stderr_log.telemetry(data)
+                    if percent is not None:
+                        progress.emit(base + min(100.0, percent) / 2.0, extra=dict(telemetry, **{"pass": index + 1}))
+
+                ret = run_ffmpeg_with_progress(self.task_id, ffmpeg_path, args, on_progress, on_stderr=stderr_log.feed)
+                if ret != 0:
+                    raise stderr_log.error(f"FFmpeg pass {index + 1} failed.")
+            progress.emit(100, force=True)
+            return video_bitrate
+        finally:
+            kill_ffmpeg_for_task(self.task_id)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
     def run(self, args, payload=None):
         progress = _ProgressEmitter(self.task_id)
         try:
@@ -48,7 +190,6 @@ class CompressHandler:
                 })
                 return
             if category not in ("video", "audio", "image"):
-                from System.extensions import _detect_extension, _detect_category
                 ext, forced_cat = _detect_extension(input_path)
                 detected_cat = forced_cat or _detect_category(ext)
                 if not detected_cat or detected_cat not in ("video", "audio", "image"):
@@ -95,34 +236,104 @@ class CompressHandler:
                     total_seconds = float(payload.get("source_duration_seconds"))
             except Exception:
                 total_seconds = None
+            duration = SourceDuration(total_seconds, input_path)
+            stderr_log = FFmpegStderr((duration.feed_stderr,))
 
             progress.emit(0, force=True)
 
+            target_bytes = None
+            try:
+                if payload.get("target_size_bytes") is not None:
+                    target_bytes = int(float(payload.get("target_size_bytes")))
+            except Exception:
+                target_bytes = None
+            if target_bytes is not None:
+                if category != "video":
+                    raise Exception("target_size_bytes is only supported for video.")
+                if target_bytes <= 0:
+                    raise Exception("target_size_bytes must be positive.")
+                source_seconds, info = self._resolve_source_info(input_path, total_seconds, ffmpeg_path)
+                video_bitrate = self._run_two_pass(
+                    ffmpeg_path, ffmpeg_args, input_path, output_path,
+                    target_bytes, source_seconds, info, payload, progress
+                )
+                _emit({
+                    "type": "finished",
+                    "id": self.task_id,
+                    "success": True,
+                    "output_path": output_path,
+                    "video_bitrate": video_bitrate,
+                    "size_bytes": os.path.getsize(output_path) if os.path.isfile(output_path) else None
+                })
+                return
+
+            stream_copy = False
+            if category in ("video", "audio") and payload.get("stream_copy") is not False:
+                ffprobe_path = resolve_ffprobe_path(str(payload.get("ffprobe_path") or "").strip() or None, ffmpeg_path)
+                planned = plan_stream_copy(ffmpeg_args, input_path, output_path, ffprobe_path, container_only=True)
+                if planned:
+                    ffmpeg_args = planned
+                    stream_copy = True
+
+            segments = 1
+            if category == "video" and not stream_copy and payload.get("parallel_segments") and can_segment(ffmpeg_args, input_path, output_path):
+                source_seconds, info = self._resolve_source_info(input_path, total_seconds, ffmpeg_path)
+                segments = resolve_segment_count(payload.get("parallel_segments"), source_seconds)
+            if segments > 1:
+                has_audio = None
+                if info.get("video_codec"):
+                    has_audio = bool(info.get("audio_codec"))
+                SegmentTranscoder(
+                    self.task_id, ffmpeg_path, ffmpeg_args, input_path, output_path,
+                    source_seconds, segments, has_audio, lambda percent: progress.emit(percent, force=percent >= 100)
+                ).run()
+                _emit({
+                    "type": "finished",
+                    "id": self.task_id,
+                    "success": True,
+                    "output_path": output_path,
+                    "segments": segments
+                })
+                return
+
             def on_progress(data):
-                percent, eta_seconds = _resolve_progress_percent(data, total_seconds)
+                percent, eta_seconds = _resolve_progress_percent(data, duration.seconds)
+                telemetry = stderr_log.telemetry(data)
                 if percent is not None:
-                    progress.emit(percent, eta_seconds=eta_seconds)
+                    progress.emit(percent, eta_seconds=eta_seconds, extra=telemetry)
 
-            ret = run_ffmpeg_with_progress(self.task_id, ffmpeg_path, ffmpeg_args, on_progress)
+            ret = run_ffmpeg_with_progress(
+                self.task_id, ffmpeg_path, ffmpeg_args, on_progress, on_stderr=stderr_log.feed
+            )
             if ret != 0:
+                failure = stderr_log.error("FFmpeg compression failed.")
                 _emit({
                     "type": "finished",
                     "id": self.task_id,
                     "success": False,
-                    "error": "FFmpeg compression failed."
+                    "error": str(failure),
+                    "error_code": failure.code,
+                    "stderr": failure.stderr
                 })
                 return
 
-            _emit({
+            event = {
                 "type": "finished",
                 "id": self.task_id,
                 "success": True,
                 "output_path": output_path
-            })
+            }
+            if stream_copy:
+                event["stream_copy"] = True
+            _emit(event)
         except Exception as e:
-            _emit({
+            event = {
                 "type": "finished",
                 "id": self.task_id,
                 "success": False,
                 "error": str(e)
-            })
\ No newline at end of file
+            }
+            if isinstance(e, FFmpegError):
+                event["error_code"] = e.code
+                event["stderr"] = e.stderr
+            _emit(event)
\ No newline at end of file
@@ -1,15 +1,10 @@
 import os
 import json
 import time
-import io
 import base64
-import shutil
-import tempfile
-import zipfile
-import tarfile
-import gzip
-import bz2
-import lzma
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 try:
     from hachoir.parser import createParser
@@ -29,16 +24,6 @@ try:
 except Exception:
     pillow_heif = None
 
-try:
-    import py7zr
-except Exception:
-    py7zr = None
-
-try:
-    import rarfile
-except Exception:
-    rarfile = None
-
 try:
     from fontTools.ttLib import TTFont
 except Exception:
@@ -49,8 +34,22 @@ try:
 except Exception:
     brotli = None
 
-from System.ffmpeg_runner import run_ffmpeg_with_progress
-from System.utils import emit_json, ProgressEmitter, parse_time_to_seconds, resolve_progress_percent, is_safe_path
+from System.archive_stream import (
+    ARCHIVE_CODECS, ARCHIVE_CODEC_ALIASES,
+    ZipSource, TarSource, RarSource, SevenZipSource, SingleFileSource,
+    ZipSink, TarSink, SevenZipSink, SingleFileSink, transcode_compression_layer
+)
+from System.ffmpeg_runner import FFmpegError, FFmpegStderr, SourceDuration, run_ffmpeg_with_progress, kill_ffmpeg_for_task
+from System.image_frames import ALPHA_FRAME_FORMATS, FrameDurations, ResizedFrameSequence, is_animated_image
+from System.image_quality import QualitySearch
+from System.media_info import (
+    FFPROBE_TIMEOUT, PROBE_CACHE_DIR,
+    ffprobe_duration, ffprobe_media_info, probe_media_info, resolve_ffprobe_path
+)
+from System.image_tiles import can_decode_in_strips, estimate_image_bytes, reduce_in_strips, resolve_memory_budget
+from System.parallel_compress import resolve_thread_count
+from System.remux_planner import plan_stream_copy
+from System.utils import emit_json, ProgressEmitter, parse_time_to_seconds, resolve_progress_percent
 
 _emit = emit_json
 _ProgressEmitter = ProgressEmitter
@@ -110,83 +109,226 @@ def _extract_image_size(path):
     except Exception:
         return None, None
 
+SVG_EMBED_FORMATS = {
+    "png": "PNG",
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    "webp": "WEBP",
+}
+
+SVG_EMBED_MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+ENCODER_SPEED_PRESETS = {
+    "slowest": 0,
+    "slow": 3,
+    "medium": 6,
+    "fast": 8,
+    "fastest": 10,
+}
+
+X265_SPEED_PRESETS = (
+    "veryslow", "veryslow", "slower", "slow", "slow", "medium",
+    "medium", "fast", "faster", "veryfast", "ultrafast"
+)
+
+FAST_PREVIEW_SPEED = 10
+FAST_PREVIEW_QUALITY = 50
+
+_heif_encoder_x265 = None
+
+
+def _heif_encoder_is_x265():
+    global _heif_encoder_x265
+    if _heif_encoder_x265 is None:
+        try:
+            _heif_encoder_x265 = str(pillow_heif.libheif_info().get("HEIF", "")).lower().startswith("x265")
+        except Exception:
+            _heif_encoder_x265 = False
+    return _heif_encoder_x265
+
+
+class _Base64StreamWriter:
+    def __init__(self, handle, chunk_size=768 * 1024):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.pending = bytearray()
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.pending += data
+        if len(self.pending) >= self.chunk_size:
+            usable = len(self.pending) - (len(self.pending) % 3)
+            self.handle.write(base64.b64encode(bytes(self.pending[:usable])))
+            del self.pending[:usable]
+        return len(data)
+
+    def flush(self):
+        return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.pending:
+            self.handle.write(base64.b64encode(bytes(self.pending)))
+            self.pending = bytearray()
+
+
 class ConvertMetadataHandler:
     def __init__(self, task_id):
         self.task_id = task_id
 
-    def run(self, args):
+    @staticmethod
+    def _resolve_probe_options(payload):
+        payload = payload or {}
+        probe = str(payload.get("probe") or "").strip().lower()
+        if probe not in ("", "native", "ffprobe"):
+            raise Exception(f"Unsupported probe mode: {probe}")
         try:
-            if not args:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "No file path provided"
-                })
-                return
+            timeout = float(payload.get("probe_timeout") or FFPROBE_TIMEOUT)
+        except Exception:
+            timeout = FFPROBE_TIMEOUT
+        cache_dir = payload.get("probe_cache_dir") or PROBE_CACHE_DIR
+        if payload.get("probe_cache") is False:
+            cache_dir = None
+        return {
+            "rich": probe == "ffprobe",
+            "ffprobe_path": resolve_ffprobe_path(
+                str(payload.get("ffprobe_path") or "").strip() or None,
+                str(payload.get("ffmpeg_path") or "").strip() or None
+            ),
+            "timeout": max(1.0, timeout),
+            "cache_dir": cache_dir
+        }
+
+    def _collect(self, path, options):
+        if not os.path.isfile(path):
+            raise Exception("File not found")
+
+        ext, forced_category = _detect_extension(path)
+        category = forced_category or _detect_category(ext)
+        if not category:
+            raise Exception("Unsupported format")
+
+        size_bytes = os.path.getsize(path)
+
+        duration_seconds = None
+        duration_string = None
+        media_info = None
+        probe_error = None
+        if category in ("video", "audio"):
+            if options["rich"]:
+                try:
+                    media_info = ffprobe_media_info(
+                        path,
+                        options["ffprobe_path"],
+                        options["timeout"],
+                        options["cache_dir"]
+                    )
+                except Exception as e:
+                    probe_error = str(e)
+            if media_info is None:
+                media_info = probe_media_info(path, ext)
+            if media_info:
+                duration_seconds = media_info.get("duration_seconds")
+            if duration_seconds is None:
+                duration_seconds = _extract_duration(path)
+            if duration_seconds is None and not options["rich"]:
+                duration_seconds = ffprobe_duration(path, options["ffprobe_path"], options["timeout"])
+            duration_string = _format_duration(duration_seconds)
+        width = None
+        height = None
+        if category == "image":
+            width, height = _extract_image_size(path)
+        elif media_info:
+            width = media_info.get("width")
+            height = media_info.get("height")
+
+        base_name = os.path.basename(path)
+        if ext:
+            ext_suffix = f".{ext}"
+            if base_name.lower().endswith(ext_suffix):
+                base_name = base_name[: -len(ext_suffix)]
+
+        data = {
+            "path": path,
+            "name": base_name,
+            "extension": ext or "",
+            "category": category,
+            "size_bytes": size_bytes
+        }
+
+        if duration_seconds is not None:
+            data["duration_seconds"] = duration_seconds
+        if duration_string:
+            data["duration_string"] = duration_string
+        if width is not None:
+            data["width"] = width
+        if height is not None:
+            data["height"] = height
+        if duration_seconds is not None:
+            data["duration_ms"] = int(round(duration_seconds * 1000))
+        if media_info:
+            for key in ("container", "video_codec", "audio_codec", "bitrate", "sample_rate", "channels", "frame_rate", "streams"):
+                if media_info.get(key) is not None:
+                    data[key] = media_info[key]
+        if options["rich"]:
+            data["probe"] = "ffprobe" if probe_error is None else "native"
+            if probe_error:
+                data["probe_error"] = probe_error
+        return data
+
+    def _collect_item(self, path, options):
+        try:
+            return {"path": path, "success": True, "data": self._collect(path, options)}
+        except Exception as e:
+            return {"path": path, "success": False, "error": str(e)}
 
-            path = args[-1]
-            if not os.path.isfile(path):
+    def run(self, args, payload=None):
+        try:
+            options = self._resolve_probe_options(payload)
+            paths = (payload or {}).get("paths")
+            if paths is not None:
+                if not isinstance(paths, list) or not paths:
+                    raise Exception("paths must be a non-empty list")
+                workers = min(resolve_thread_count((payload or {}).get("workers", "auto")), len(paths))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pulsar-probe") as pool:
+                    items = list(pool.map(lambda item: self._collect_item(str(item), options), paths))
                 _emit({
-                    "type": "finished",
+                    "type": "metadata_batch",
                     "id": self.task_id,
-                    "success": False,
-                    "error": "File not found"
+                    "success": True,
+                    "data": {
+                        "items": items,
+                        "total": len(items),
+                        "failed": sum(1 for item in items if not item["success"])
+                    }
                 })
                 return
 
-            ext, forced_category = _detect_extension(path)
-            category = forced_category or _detect_category(ext)
-            if not category:
+            if not args:
                 _emit({
                     "type": "finished",
                     "id": self.task_id,
                     "success": False,
-                    "error": "Unsupported format"
+                    "error": "No file path provided"
                 })
                 return
 
-            size_bytes = os.path.getsize(path)
-
-            duration_seconds = None
-            duration_string = None
-            if category in ("video", "audio"):
-                duration_seconds = _extract_duration(path)
-                duration_string = _format_duration(duration_seconds)
-            width = None
-            height = None
-            if category == "image":
-                width, height = _extract_image_size(path)
-
-            base_name = os.path.basename(path)
-            if ext:
-                ext_suffix = f".{ext}"
-                if base_name.lower().endswith(ext_suffix):
-                    base_name = base_name[: -len(ext_suffix)]
-
-            payload = {
+            _emit({
                 "type": "metadata",
                 "id": self.task_id,
                 "success": True,
-                "data": {
-                    "path": path,
-                    "name": base_name,
-                    "extension": ext or "",
-                    "category": category,
-                    "size_bytes": size_bytes
-                }
-            }
-
-            if duration_seconds is not None:
-                payload["data"]["duration_seconds"] = duration_seconds
-            if duration_string:
-                payload["data"]["duration_string"] = duration_string
-            if width is not None:
-                payload["data"]["width"] = width
-            if height is not None:
-                payload["data"]["height"] = height
-
-            _emit(payload)
+                "data": self._collect(args[-1], options)
+            })
         except Exception as e:
             _emit({
                 "type": "finished",
@@ -199,6 +341,7 @@ class ConvertMetadataHandler:
 class ConvertHandler:
     def __init__(self, task_id):
         self.task_id = task_id
+        self.stream_copy = False
 
     @staticmethod
     def _parse_int(value):
@@ -208,6 +351,14 @@ class ConvertHandler:
             return None
         return parsed if parsed > 0 else None
 
+    @staticmethod
+    def _parse_ratio(value):
+        try:
+            parsed = float(value)
+        except Exception:
+            return None
+        return parsed if 0 < parsed <= 1 else None
+
     @staticmethod
     def _normalize_format(value):
         if not value:
@@ -252,11 +403,95 @@ class ConvertHandler:
         return img
 
     @staticmethod
-    def _build_save_kwargs(fmt, quality, size):
+    def _apply_jpeg_draft(img, target_size):
+        target_w, target_h = target_size
+        if img.format == "JPEG" and target_w < img.size[0] and target_h < img.size[1]:
+            try:
+                img.draft(img.mode, target_size)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _resize_image(img, target_size):
+        if target_size == img.size:
+            return img
+        ConvertHandler._apply_jpeg_draft(img, target_size)
+        if img.size == target_size:
+            return img
+        return img.resize(target_size, Image.LANCZOS)
+
+    def _fit_memory_budget(self, img, target_size, target_format, payload, progress):
+        budget = resolve_memory_budget(payload.get("memory_limit_mb"))
+        self._apply_jpeg_draft(img, target_size)
+        needed = estimate_image_bytes(img.mode, img.size)
+        if target_size != img.size:
+            needed += estimate_image_bytes(img.mode, target_size)
+        if target_format in ("JPEG", "JPG", "SVG") and img.mode != "RGB":
+            needed += estimate_image_bytes("RGB", target_size)
+        if needed <= budget:
+            return img
+        target_w, target_h = target_size
+        factor = min(img.size[0] // max(1, target_w), img.size[1] // max(1, target_h))
+        if factor >= 2 and can_decode_in_strips(img):
+            return reduce_in_strips(
+                img, factor, budget,
+                on_progress=lambda current, total: self._emit_step_progress(progress, 15, 35, current, total)
+            )
+        needed_mb = int(needed / (1024 * 1024)) + 1
+        budget_mb = int(budget / (1024 * 1024))
+        raise Exception(f"Image needs about {needed_mb} MB, above the {budget_mb} MB memory limit.")
+
+    @staticmethod
+    def _resolve_encoder_options(payload, defaults=None):
+        options = dict(defaults or {})
+        speed = payload.get("encoder_speed")
+        if speed is not None:
+            raw = str(speed).strip().lower()
+            if raw in ENCODER_SPEED_PRESETS:
+                options["speed"] = ENCODER_SPEED_PRESETS[raw]
+            else:
+                try:
+                    options["speed"] = max(0, min(10, int(raw)))
+                except Exception:
+                    raise Exception("Unsupported encoder speed.")
+        if payload.get("encoder_threads") is not None:
+            options["threads"] = resolve_thread_count(payload.get("encoder_threads"))
+        if payload.get("fast_preview") is not None:
+            options["fast_preview"] = bool(payload.get("fast_preview"))
+        return options
+
+    @staticmethod
+    def _build_save_kwargs(fmt, quality, size, encoder=None):
         kwargs = {}
+        encoder = encoder or {}
         quality_val = ConvertHandler._parse_int(quality)
+        fast_preview = encoder.get("fast_preview", False)
+        speed = encoder.get("speed")
+        threads = encoder.get("threads")
+        if fast_preview:
+            speed = FAST_PREVIEW_SPEED if speed is None else speed
+            threads = threads or resolve_thread_count("auto")
+            if not quality_val and fmt in ("AVIF", "HEIF", "HEIC"):
+                quality_val = FAST_PREVIEW_QUALITY
         if fmt in ("JPEG", "WEBP", "AVIF", "HEIF", "HEIC") and quality_val:
             kwargs["quality"] = max(1, min(100, quality_val))
+        if fmt == "AVIF":
+            if speed is not None:
+                kwargs["speed"] = speed
+            if threads:
+                kwargs["max_threads"] = threads
+            if fast_preview:
+                kwargs["subsampling"] = "4:2:0"
+        if fmt in ("HEIF", "HEIC"):
+            enc_params = {}
+            if speed is not None:
+                enc_params["preset"] = X265_SPEED_PRESETS[speed]
+            if threads:
+                enc_params["x265:pools"] = str(threads)
+            if enc_params and _heif_encoder_is_x265():
+                kwargs["enc_params"] = enc_params
+            if fast_preview:
+                kwargs["chroma"] = 420
         if fmt == "PNG" and quality_val:
             compress_level = int(round((100 - max(1, min(100, quality_val))) * 9 / 100))
             kwargs["compress_level"] = max(0, min(9, compress_level))
@@ -353,187 +588,297 @@ class ConvertHandler:
             return f"{write}:"
         return None
 
-    @staticmethod
-    def _safe_relpath(path, base):
-        rel = os.path.relpath(path, base)
-        return rel.replace("\\", "/")
-
     def _emit_step_progress(self, progress, base, span, current, total):
         if total <= 0:
             progress.emit(base + span)
             return
+        current = min(current, total)
         percent = base + (span * (current / total))
         progress.emit(percent)
 
-    def _extract_zip(self, input_path, work_dir, progress):
-        with zipfile.ZipFile(input_path) as zf:
-            infos = zf.infolist()
-            total = sum(info.file_size for info in infos) or len(infos)
-            done = 0
-            for info in infos:
-                target_path = os.path.join(work_dir, info.filename)
-                if not is_safe_path(work_dir, target_path):
-                    continue
-                zf.extract(info, work_dir)
-                done += info.file_size or 1
-                self._emit_step_progress(progress, 15, 40, done, total)
-
-    def _extract_tar(self, input_path, work_dir, mode, progress):
-        with tarfile.open(input_path, mode) as tf:
-            members = tf.getmembers()
-            total = sum(m.size for m in members) or len(members)
-            done = 0
-            for member in members:
-                target_path = os.path.join(work_dir, member.name)
-                if not is_safe_path(work_dir, target_path):
-                    continue
-                tf.extract(member, work_dir)
-                done += member.size or 1
-                self._emit_step_progress(progress, 15, 40, done, total)
-
-    def _extract_7z(self, input_path, work_dir, progress):
-        if not py7zr:
-            raise Exception("py7zr is not available.")
-        with py7zr.SevenZipFile(input_path, mode="r") as zf:
-            items = zf.list()
-            for item in items:
-                target_path = os.path.join(work_dir, item.filename)
-                if not is_safe_path(work_dir, target_path):
-                    raise Exception(f"Unsafe path in archive: {item.filename}")
-            total = sum(item.uncompressed for item in items if item.uncompressed) or len(items)
-            zf.extractall(work_dir)
-            done = total if total else len(items)
-            self._emit_step_progress(progress, 15, 40, done, total if total else len(items))
-
-    def _extract_rar(self, input_path, work_dir, progress):
-        if not rarfile:
-            raise Exception("rarfile is not available.")
-        with rarfile.RarFile(input_path) as rf:
-            infos = rf.infolist()
-            total = sum(info.file_size for info in infos) or len(infos)
+    def _open_archive_source(self, input_path, input_format):
+        if input_format in ("zip",):
+            return ZipSource(input_path)
+        if input_format in ("7z",):
+            return SevenZipSource(input_path)
+        if input_format in ("rar",):
+            return RarSource(input_path)
+        tar_mode = self._resolve_tar_mode(input_format, for_write=False)
+        if tar_mode:
+            return TarSource(input_path, tar_mode)
+        if input_format in ("gz", "bz2", "xz"):
+            return SingleFileSource(input_path, input_format)
+        raise Exception("Unsupported input archive format.")
+
+    @staticmethod
+    def _resolve_archive_options(payload):
+        level = None
+        try:
+            if payload.get("compression_level") is not None:
+                level = int(payload.get("compression_level"))
+        except Exception:
+            level = None
+        codec = ConvertHandler._normalize_format(payload.get("compression_codec")) or None
+        if codec:
+            codec = ARCHIVE_CODEC_ALIASES.get(codec, codec)
+            if codec not in ARCHIVE_CODECS:
+                raise Exception("Unsupported compression codec.")
+        return {
+            "threads": resolve_thread_count(payload.get("threads")),
+            "level": level,
+            "codec": codec
+        }
+
+    def _open_archive_sink(self, output_path, output_format, options):
+        threads = options.get("threads", 1)
+        level = options.get("level")
+        codec = options.get("codec")
+        if output_format == "zip":
+            return ZipSink(output_path, threads=threads, codec=codec, level=level)
+        if output_format == "7z":
+            return SevenZipSink(output_path, codec=codec, level=level)
+        tar_mode = self._resolve_tar_mode(output_format, for_write=True)
+        if tar_mode:
+            return TarSink(output_path, tar_mode, threads=threads, level=level)
+        if output_format in ("gz", "bz2", "xz"):
+            return SingleFileSink(output_path, output_format, threads=threads, level=level)
+        raise Exception("Unsupported output archive format.")
+
+    def _resolve_compression_layer(self, fmt):
+        tar_mode = self._resolve_tar_mode(fmt, for_write=False)
+        if tar_mode:
+            return "tar", tar_mode.split(":", 1)[1]
+        if self._archive_requires_single_file(fmt):
+            return "single", fmt
+        return None, None
+
+    def _transcode_compression_layer(self, input_path, input_compression, output_path, output_compression, progress, options):
+        progress.emit(0, force=True)
+        try:
+            transcode_compression_layer(
+                input_path, input_compression, output_path, output_compression,
+                threads=options.get("threads", 1),
+                level=options.get("level"),
+                on_progress=lambda current, total: self._emit_step_progress(progress, 5, 90, current, total)
+            )
+        except BaseException:
+            try:
+                os.remove(output_path)
+            except Exception:
+                pass
+            raise
+        progress.emit(100, force=True)
+
+    def _save_animated(self, img, output_path, target_format, target_size, payload, progress):
+        mode = "RGBA" if target_format in ALPHA_FRAME_FORMATS else "RGB"
+        frames = ResizedFrameSequence(
+            img, target_size, mode,
+            on_frame=lambda current, total: self._emit_step_progress(progress, 15, 80, current, total)
+        )
+        save_kwargs = self._build_save_kwargs(
+            target_format, payload.get("image_quality"), target_size, self._resolve_encoder_options(payload)
+        )
+        save_kwargs["save_all"] = True
+        save_kwargs["duration"] = FrameDurations(frames)
+        if "loop" in img.info:
+            save_kwargs["loop"] = img.info["loop"]
+        frames.save(output_path, format=target_format, **save_kwargs)
+        progress.emit(100, force=True)
+
+    def _save_quality_target(self, img, output_path, target_format, save_kwargs, target_bytes, target_ssim, progress):
+        save_kwargs = {key: value for key, value in save_kwargs.items() if key != "quality"}
+        search = QualitySearch(
+            img, target_format, save_kwargs,
+            target_bytes=target_bytes,
+            target_ssim=target_ssim,
+            on_step=(lambda step: progress.emit(80 + min(15, step * 2))) if progress else None
+        )
+        result = search.run()
+        with open(output_path, "wb") as handle:
+            handle.write(result["data"])
+        _emit({
+            "type": "quality_target",
+            "id": self.task_id,
+            "quality": result["quality"],
+            "size_bytes": result["size"],
+            "ssim": result["ssim"],
+            "encodes": result["encodes"],
+            "met": result["met"]
+        })
+
+    @staticmethod
+    def _resolve_image_save_format(output_format):
+        if output_format in ("psd", "ai", "svg"):
+            raise Exception("Unsupported output format.")
+        if output_format in ("heic", "heif") and pillow_heif is None:
+            raise Exception("HEIC/HEIF requires pillow-heif.")
+        registered = Image.registered_extensions()
+        ext_key = f".{output_format.lower()}"
+        if ext_key not in registered and output_format in ("heic", "heif") and ".heif" in registered:
+            ext_key = ".heif"
+        if ext_key not in registered:
+            raise Exception("Unsupported output format.")
+        target_format = registered[ext_key]
+        if target_format not in Image.SAVE and target_format not in Image.SAVE_ALL:
+            raise Exception("Unsupported output format.")
+        return target_format
+
+    def _resolve_image_variants(self, payload, original_size):
+        variants = []
+        encoder = self._resolve_encoder_options(payload)
+        for index, spec in enumerate(payload.get("outputs")):
+            if not isinstance(spec, dict):
+                raise Exception(f"Output {index + 1} is not an object.")
+            output_path = str(spec.get("output_path") or "").strip()
+            if not output_path:
+                raise Exception(f"Output {index + 1} path is missing.")
+            output_format = self._resolve_output_format(spec, output_path)
+            if not output_format:
+                raise Exception(f"Output {index + 1} format is missing.")
+            target_format = self._resolve_image_save_format(output_format)
+            width = self._parse_int(spec.get("image_width", payload.get("image_width")))
+            height = self._parse_int(spec.get("image_height", payload.get("image_height")))
+            variants.append({
+                "index": index,
+                "output_path": output_path,
+                "format": target_format,
+                "size": self._resolve_target_size(original_size, width, height),
+                "quality": spec.get("image_quality", payload.get("image_quality")),
+                "target_bytes": self._parse_int(spec.get("target_bytes")),
+                "target_ssim": self._parse_ratio(spec.get("target_ssim")),
+                "encoder": self._resolve_encoder_options(spec, encoder)
+            })
+        return variants
+
+    def _encode_image_variant(self, img, variant, progress):
+        output_dir = os.path.dirname(variant["output_path"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        target_format = variant["format"]
+        if target_format in ("JPEG", "JPG"):
+            img = self._ensure_rgb(img)
+        save_kwargs = self._build_save_kwargs(target_format, variant["quality"], variant["size"], variant["encoder"])
+        if variant["target_bytes"] or variant["target_ssim"] is not None:
+            self._save_quality_target(
+                img, variant["output_path"], target_format, save_kwargs,
+                variant["target_bytes"], variant["target_ssim"], None
+            )
+        else:
+            img.save(variant["output_path"], format=target_format, **save_kwargs)
+        return variant["output_path"]
+
+    def _convert_image_variants(self, input_path, payload, progress):
+        progress.emit(0, force=True)
+        with Image.open(input_path) as img:
+            progress.emit(5)
+            variants = self._resolve_image_variants(payload, img.size)
+            largest = max((variant["size"] for variant in variants), key=lambda size: size[0] * size[1])
+            if all(variant["size"][0] <= largest[0] and variant["size"][1] <= largest[1] for variant in variants):
+                img = self._fit_memory_budget(img, largest, variants[0]["format"], payload, progress)
+            img.load()
+            progress.emit(15)
+            ordered = sorted(variants, key=lambda variant: variant["size"][0] * variant["size"][1], reverse=True)
+            threads = min(resolve_thread_count(payload.get("threads", "auto")), len(variants))
+            resized = {}
+            previous = img
             done = 0
-            for info in infos:
-                target_path = os.path.join(work_dir, info.filename)
-                if not is_safe_path(work_dir, target_path):
-                    continue
-                rf.extract(info, work_dir)
-                done += info.file_size or 1
-                self._emit_step_progress(progress, 15, 40, done, total)
-
-    def _extract_single(self, input_path, work_dir, fmt, progress):
-        opener = gzip.open if fmt == "gz" else bz2.open if fmt == "bz2" else lzma.open
-        total = os.path.getsize(input_path) or 1
-        name = os.path.basename(input_path)
-        for suffix in (".gz", ".bz2", ".xz"):
-            if name.lower().endswith(suffix):
-                name = name[: -len(suffix)]
-                break
-        output_path = os.path.join(work_dir, name or "payload")
-        done = 0
-        with opener(input_path, "rb") as src, open(output_path, "wb") as dst:
-            while True:
-                chunk = src.read(1024 * 1024)
-                if not chunk:
-                    break
-                dst.write(chunk)
-                done += len(chunk)
-                self._emit_step_progress(progress, 15, 40, done, total)
-
-    def _pack_zip(self, work_dir, output_path, progress):
-        files = []
-        for root, _, names in os.walk(work_dir):
-            for name in names:
-                full = os.path.join(root, name)
-                files.append(full)
-        total = sum(os.path.getsize(p) for p in files) or len(files)
-        done = 0
-        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for full in files:
-                rel = self._safe_relpath(full, work_dir)
-                zf.write(full, rel)
-                done += os.path.getsize(full) or 1
-                self._emit_step_progress(progress, 60, 35, done, total)
-
-    def _pack_tar(self, work_dir, output_path, mode, progress):
-        files = []
-        for root, _, names in os.walk(work_dir):
-            for name in names:
-                files.append(os.path.join(root, name))
-        total = sum(os.path.getsize(p) for p in files) or len(files)
-        done = 0
-        with tarfile.open(output_path, mode) as tf:
-            for full in files:
-                rel = self._safe_relpath(full, work_dir)
-                tf.add(full, arcname=rel)
-                done += os.path.getsize(full) or 1
-                self._emit_step_progress(progress, 60, 35, done, total)
-
-    def _pack_7z(self, work_dir, output_path, progress):
-        if not py7zr:
-            raise Exception("py7zr is not available.")
-        files = []
-        for root, _, names in os.walk(work_dir):
-            for name in names:
-                files.append(os.path.join(root, name))
-        total = sum(os.path.getsize(p) for p in files) or len(files)
-        with py7zr.SevenZipFile(output_path, "w") as zf:
-            zf.writeall(work_dir, arcname=".")
-        self._emit_step_progress(progress, 60, 35, total, total)
-
-    def _pack_single(self, work_dir, output_path, fmt, progress):
-        files = []
-        for root, _, names in os.walk(work_dir):
-            for name in names:
-                files.append(os.path.join(root, name))
-        if len(files) != 1:
-            raise Exception("Single-file archive requires exactly one file.")
-        input_path = files[0]
-        opener = gzip.open if fmt == "gz" else bz2.open if fmt == "bz2" else lzma.open
-        total = os.path.getsize(input_path) or 1
-        done = 0
-        with open(input_path, "rb") as src, opener(output_path, "wb") as dst:
-            while True:
-                chunk = src.read(1024 * 1024)
-                if not chunk:
-                    break
-                dst.write(chunk)
-                done += len(chunk)
-                self._emit_step_progress(progress, 60, 35, done, total)
-
-    def _convert_archive(self, input_path, output_path, output_format, progress):
+            pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pulsar-encode")
+            try:
+                futures = []
+                for step, variant in enumerate(ordered, 1):
+                    size = variant["size"]
+                    if size not in resized:
+                        base = previous if previous.size[0] >= size[0] and previous.size[1] >= size[1] else img
+                        resized[size] = base if base.size == size else self._resize_image(base, size)
+                        previous = resized[size]
+                        self._emit_step_progress(progress, 15, 35, step, len(ordered))
+                        source = resized[size]
+                    else:
+                        source = resized[size].copy()
+                    futures.append(pool.submit(self._encode_image_variant, source, variant, progress))
+                for future in futures:
+                    future.result()
+                    done += 1
+                    self._emit_step_progress(progress, 50, 50, done, len(futures))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                pool.shutdown(wait=True)
+        progress.emit(100, force=True)
+        return [variant["output_path"] for variant in variants]
+
+    @staticmethod
+    def _resolve_svg_embed_format(value, img):
+        embed = ConvertHandler._normalize_format(value) or "png"
+        if embed == "auto":
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+            return "PNG" if has_alpha or img.mode in ("1", "P") else "JPEG"
+        if embed not in SVG_EMBED_FORMATS:
+            raise Exception("Unsupported SVG embed format.")
+        return SVG_EMBED_FORMATS[embed]
+
+    def _write_svg(self, img, output_path, size, embed_format, quality, progress):
+        if embed_format == "JPEG":
+            img = self._ensure_rgb(img)
+        elif img.mode not in ("RGBA", "RGB"):
+            img = img.convert("RGBA")
+        save_kwargs = self._build_save_kwargs(embed_format, quality, size)
+        mime = SVG_EMBED_MIME_TYPES[embed_format]
+        width, height = size
+        try:
+            with open(output_path, "wb") as handle:
+                handle.write((
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                    f'viewBox="0 0 {width} {height}">'
+                    f'<image href="data:{mime};base64,'
+                ).encode("ascii"))
+                encoder = _Base64StreamWriter(handle)
+                img.save(encoder, format=embed_format, **save_kwargs)
+                encoder.close()
+                progress.emit(80)
+                handle.write(f'" width="{width}" height="{height}" /></svg>'.encode("ascii"))
+        except BaseException:
+            try:
+                os.remove(output_path)
+            except Exception:
+                pass
+            raise
+
+    def _convert_archive(self, input_path, output_path, output_format, progress, options=None):
         input_format = self._detect_archive_format(input_path) or ""
         output_format = output_format.lower()
-        temp_dir = tempfile.mkdtemp(prefix="pulsar-archive-")
-        try:
-            if input_format in ("zip",):
-                self._extract_zip(input_path, temp_dir, progress)
-            elif input_format in ("7z",):
-                self._extract_7z(input_path, temp_dir, progress)
-            elif input_format in ("rar",):
-                self._extract_rar(input_path, temp_dir, progress)
-            elif self._resolve_tar_mode(input_format, for_write=False):
-                mode = self._resolve_tar_mode(input_format, for_write=False)
-                self._extract_tar(input_path, temp_dir, mode, progress)
-            elif input_format in ("gz", "bz2", "xz"):
-                self._extract_single(input_path, temp_dir, input_format, progress)
-            else:
-                raise Exception("Unsupported input archive format.")
+        options = options or {}
+        input_family, input_compression = self._resolve_compression_layer(input_format)
+        output_family, output_compression = self._resolve_compression_layer(output_format)
+        if input_family and input_family == output_family:
+            self._transcode_compression_layer(input_path, input_compression, output_path, output_compression, progress, options)
+            return
+        source = self._open_archive_source(input_path, input_format)
+        sink = self._open_archive_sink(output_path, output_format, options)
+        progress.emit(0, force=True)
+        done = 0
 
-            if output_format == "zip":
-                self._pack_zip(temp_dir, output_path, progress)
-            elif output_format == "7z":
-                self._pack_7z(temp_dir, output_path, progress)
-            else:
-                tar_mode = self._resolve_tar_mode(output_format, for_write=True)
-                if tar_mode:
-                    self._pack_tar(temp_dir, output_path, tar_mode, progress)
-                elif output_format in ("gz", "bz2", "xz"):
-                    self._pack_single(temp_dir, output_path, output_format, progress)
-                else:
-                    raise Exception("Unsupported output archive format.")
-            progress.emit(100, force=True)
-        finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        def on_chunk(size):
+            nonlocal done
+            done += size
+            current, total = source.progress(done)
+            self._emit_step_progress(progress, 5, 90, current, total)
+
+        try:
+            with source, sink:
+                for member in source.members():
+                    with member.open() as stream:
+                        sink.add(member, stream, on_chunk)
+        except BaseException:
+            try:
+                os.remove(output_path)
+            except Exception:
+                pass
+            raise
+        progress.emit(100, force=True)
 
     def _convert_font(self, input_path, output_path, output_format, progress):
         if not TTFont:
@@ -554,6 +899,159 @@ class ConvertHandler:
         font.save(output_path)
         progress.emit(100, force=True)
 
+    def _convert(self, payload, progress):
+        input_path = str(payload.get("input_path") or "").strip()
+        output_path = str(payload.get("output_path") or "").strip()
+        category = str(payload.get("category") or "").strip().lower()
+        if not input_path:
+            raise Exception("Input path is missing.")
+        if category and category not in ("image", "archive", "font", "video", "audio"):
+            raise Exception("Unsupported conversion category.")
+        if isinstance(payload.get("outputs"), list) and payload.get("outputs"):
+            if category and category != "image":
+                raise Exception("Multiple outputs are only supported for images.")
+            if not os.path.isfile(input_path):
+                raise Exception("File not found.")
+            if not Image:
+                raise Exception("Pillow is not available.")
+            return self._convert_image_variants(input_path, payload, progress)
+        if not output_path:
+            raise Exception("Output path is missing.")
+        if not os.path.isfile(input_path):
+            raise Exception("File not found.")
+
+        output_format = self._resolve_output_format(payload, output_path)
+        if not output_format:
+            raise Exception("Output format is missing.")
+        if not category:
+            if output_format in VIDEO_EXTENSIONS:
+                category = "video"
+            elif output_format in AUDIO_EXTENSIONS:
+                category = "audio"
+            elif output_format in IMAGE_EXTENSIONS:
+                category = "image"
+            elif output_format in ARCHIVE_EXTENSIONS or output_format in ("tar.gz", "tar.bz2", "tar.xz"):
+                category = "archive"
+            elif output_format in FONT_EXTENSIONS:
+                category = "font"
+        if category == "image" and not Image:
+            raise Exception("Pillow is not available.")
+        if output_format in ("psd", "ai"):
+            raise Exception("Unsupported output format.")
+        if output_format in ("heic", "heif") and pillow_heif is None:
+            raise Exception("HEIC/HEIF requires pillow-heif.")
+
+        if category == "archive":
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            options = self._resolve_archive_options(payload)
+            self._convert_archive(input_path, output_path, output_format, progress, options)
+            return output_path
+
+        if category == "font":
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            self._convert_font(input_path, output_path, output_format, progress)
+            return output_path
+
+        if category in ("video", "audio"):
+            ffmpeg_path = str(payload.get("ffmpeg_path") or "").strip()
+            ffmpeg_args = payload.get("ffmpeg_args")
+            if not ffmpeg_path:
+                raise Exception("FFmpeg path is missing.")
+            if not isinstance(ffmpeg_args, list) or not ffmpeg_args:
+                raise Exception("FFmpeg args are missing.")
+            if payload.get("stream_copy") is not False:
+                ffprobe_path = resolve_ffprobe_path(str(payload.get("ffprobe_path") or "").strip() or None, ffmpeg_path)
+                planned = plan_stream_copy(ffmpeg_args, input_path, output_path, ffprobe_path)
+                if planned:
+                    ffmpeg_args = planned
+                    self.stream_copy = True
+            total_seconds = None
+            try:
+                if payload.get("source_duration_seconds") is not None:
+                    total_seconds = float(payload.get("source_duration_seconds"))
+            except Exception:
+                total_seconds = None
+            duration = SourceDuration(total_seconds, input_path)
+            stderr_log = FFmpegStderr((duration.feed_stderr,))
+
+            progress.emit(0, force=True)
+            def on_progress(data):
+                percent, eta_seconds = self._resolve_progress_percent(data, duration.seconds)
+                telemetry = stderr_log.telemetry(data)
+                if percent is not None:
+                    progress.emit(percent, eta_seconds=eta_seconds, extra=telemetry)
+
+            ret = run_ffmpeg_with_progress(
+                self.task_id, ffmpeg_path, ffmpeg_args, on_progress, on_stderr=stderr_log.feed
+            )
+            if ret != 0:
+                raise stderr_log.error("FFmpeg conversion failed.")
+            return output_path
+
+        if output_format == "svg":
+            progress.emit(0, force=True)
+            with Image.open(input_path) as img:
+                progress.emit(15)
+                original_size = img.size
+                target_width = self._parse_int(payload.get("image_width"))
+                target_height = self._parse_int(payload.get("image_height"))
+                target_size = self._resolve_target_size(original_size, target_width, target_height)
+                img = self._fit_memory_budget(img, target_size, "SVG", payload, progress)
+                if target_size != original_size:
+                    img = self._resize_image(img, target_size)
+                    progress.emit(55)
+                else:
+                    progress.emit(35)
+                embed_format = self._resolve_svg_embed_format(payload.get("svg_embed"), img)
+                self._write_svg(img, output_path, target_size, embed_format, payload.get("image_quality"), progress)
+                progress.emit(100, force=True)
+
+            return output_path
+
+        target_format = self._resolve_image_save_format(output_format)
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        progress.emit(0, force=True)
+        with Image.open(input_path) as img:
+            progress.emit(15)
+            original_size = img.size
+            target_width = self._parse_int(payload.get("image_width"))
+            target_height = self._parse_int(payload.get("image_height"))
+            target_size = self._resolve_target_size(original_size, target_width, target_height)
+            img = self._fit_memory_budget(img, target_size, target_format, payload, progress)
+            if is_animated_image(img) and target_format in Image.SAVE_ALL and payload.get("animated") is not False:
+                self._save_animated(img, output_path, target_format, target_size, payload, progress)
+                return output_path
+            if target_size != original_size:
+                img = self._resize_image(img, target_size)
+                progress.emit(55)
+            else:
+                progress.emit(35)
+
+            if target_format in ("JPEG", "JPG"):
+                img = self._ensure_rgb(img)
+
+            save_kwargs = self._build_save_kwargs(
+                target_format, payload.get("image_quality"), target_size, self._resolve_encoder_options(payload)
+            )
+            progress.emit(80)
+            target_bytes = self._parse_int(payload.get("target_bytes"))
+            target_ssim = self._parse_ratio(payload.get("target_ssim"))
+            if target_bytes or target_ssim is not None:
+                self._save_quality_target(img, output_path, target_format, save_kwargs, target_bytes, target_ssim, progress)
+            else:
+                img.save(output_path, format=target_format, **save_kwargs)
+            progress.emit(100, force=True)
+
+        return output_path
+
     def run(self, args, payload=None):
         progress = _ProgressEmitter(self.task_id)
         try:
@@ -567,258 +1065,263 @@ class ConvertHandler:
                 if payload is None:
                     payload = {}
 
-            input_path = str(payload.get("input_path") or "").strip()
-            output_path = str(payload.get("output_path") or "").strip()
-            category = str(payload.get("category") or "").strip().lower()
-            if not input_path:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "Input path is missing."
-                })
-                return
-            if category and category not in ("image", "archive", "font", "video", "audio"):
+            output_path = self._convert(payload, progress)
+            if isinstance(output_path, list):
                 _emit({
                     "type": "finished",
                     "id": self.task_id,
-                    "success": False,
-                    "error": "Unsupported conversion category."
-                })
-                return
-            if not output_path:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "Output path is missing."
-                })
-                return
-            if not os.path.isfile(input_path):
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "File not found."
+                    "success": True,
+                    "output_path": output_path[0],
+                    "output_paths": output_path
                 })
                 return
+            event = {
+                "type": "finished",
+                "id": self.task_id,
+                "success": True,
+                "output_path": output_path
+            }
+            if self.stream_copy:
+                event["stream_copy"] = True
+            _emit(event)
+        except Exception as e:
+            event = {
+                "type": "finished",
+                "id": self.task_id,
+                "success": False,
+                "error": str(e)
+            }
+            if isinstance(e, FFmpegError):
+                event["error_code"] = e.code
+                event["stderr"] = e.stderr
+            _emit(event)
 
-            output_format = self._resolve_output_format(payload, output_path)
-            if not output_format:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "Output format is missing."
-                })
-                return
-            if not category:
-                if output_format in VIDEO_EXTENSIONS:
-                    category = "video"
-                elif output_format in AUDIO_EXTENSIONS:
-                    category = "audio"
-                elif output_format in IMAGE_EXTENSIONS:
-                    category = "image"
-                elif output_format in ARCHIVE_EXTENSIONS or output_format in ("tar.gz", "tar.bz2", "tar.xz"):
-                    category = "archive"
-                elif output_format in FONT_EXTENSIONS:
-                    category = "font"
-            if category == "image" and not Image:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "Pillow is not available."
-                })
-                return
-            if output_format in ("psd", "ai"):
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "Unsupported output format."
-                })
-                return
-            if output_format in ("heic", "heif") and pillow_heif is None:
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": False,
-                    "error": "HEIC/HEIF requires pillow-heif."
-                })
-                return
 
-            if category == "archive":
-                output_dir = os.path.dirname(output_path)
-                if output_dir:
-                    os.makedirs(output_dir, exist_ok=True)
-                self._convert_archive(input_path, output_path, output_format, progress)
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": True,
-                    "output_path": output_path
-                })
-                return
+class _BatchItemProgress:
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
 
-            if category == "font":
-                output_dir = os.path.dirname(output_path)
-                if output_dir:
-                    os.makedirs(output_dir, exist_ok=True)
-                self._convert_font(input_path, output_path, output_format, progress)
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": True,
-                    "output_path": output_path
-                })
-                return
+    def emit(self, percent, status="processing", force=False, eta_seconds=None, extra=None):
+        if self.batch.stop_event.is_set():
+            raise Exception("Cancelled.")
+        if percent is None:
+            return
+        try:
+            percent_val = max(0.0, min(100.0, float(percent)))
+        except Exception:
+            return
+        self.batch._update_item(self.index, percent_val, force)
 
-            if category in ("video", "audio"):
-                ffmpeg_path = str(payload.get("ffmpeg_path") or "").strip()
-                ffmpeg_args = payload.get("ffmpeg_args")
-                if not ffmpeg_path:
-                    _emit({
-                        "type": "finished",
-                        "id": self.task_id,
-                        "success": False,
-                        "error": "FFmpeg path is missing."
-                    })
-                    return
-                if not isinstance(ffmpeg_args, list) or not ffmpeg_args:
-                    _emit({
-                        "type": "finished",
-                        "id": self.task_id,
-                        "success": False,
-                        "error": "FFmpeg args are missing."
-                    })
-                    return
-                total_seconds = None
-                try:
-                    if payload.get("source_duration_seconds") is not None:
-                        total_seconds = float(payload.get("source_duration_seconds"))
-                except Exception:
-                    total_seconds = None
-
-                progress.emit(0, force=True)
-                def on_progress(data):
-                    percent, eta_seconds = self._resolve_progress_percent(data, total_seconds)
-                    if percent is not None:
-                        progress.emit(percent, eta_seconds=eta_seconds)
-
-                ret = run_ffmpeg_with_progress(self.task_id, ffmpeg_path, ffmpeg_args, on_progress)
-                if ret != 0:
-                    _emit({
-                        "type": "finished",
-                        "id": self.task_id,
-                        "success": False,
-                        "error": "FFmpeg conversion failed."
-                    })
-                    return
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": True,
-                    "output_path": output_path
-                })
-                return
 
-            if output_format == "svg":
-                progress.emit(0, force=True)
-                with Image.open(input_path) as img:
-                    progress.emit(15)
-                    original_size = img.size
-                    target_width = self._parse_int(payload.get("image_width"))
-                    target_height = self._parse_int(payload.get("image_height"))
-                    target_size = self._resolve_target_size(original_size, target_width, target_height)
-                    if target_size != original_size:
-                        img = img.resize(target_size, Image.LANCZOS)
-                        progress.emit(55)
-                    else:
-                        progress.emit(35)
-                    if img.mode not in ("RGBA", "RGB"):
-                        img = img.convert("RGBA")
-                    buffer = io.BytesIO()
-                    img.save(buffer, format="PNG")
-                    progress.emit(80)
-                    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
-                    width, height = target_size
-                    svg_payload = (
-                        '<?xml version="1.0" encoding="UTF-8"?>\n'
-                        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
-                        f'viewBox="0 0 {width} {height}">'
-                        f'<image href="data:image/png;base64,{encoded}" width="{width}" height="{height}" />'
-                        '</svg>'
-                    )
-                    with open(output_path, "w", encoding="utf-8") as handle:
-                        handle.write(svg_payload)
-                    progress.emit(100, force=True)
+class BatchConvertHandler:
+    _SHARED_KEYS_SKIP = ("inputs", "input_glob", "output_dir", "workers", "input_path", "output_path")
 
-                _emit({
-                    "type": "finished",
-                    "id": self.task_id,
-                    "success": True,
-                    "output_path": output_path
-                })
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.progress = None
+        self.items = []
+        self.active = {}
+        self.completed = 0
+        self.failed = 0
+
+    @staticmethod
+    def _resolve_inputs(payload):
+        entries = []
+        inputs = payload.get("inputs")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if isinstance(inputs, list):
+            for entry in inputs:
+                if isinstance(entry, dict):
+                    if str(entry.get("input_path") or "").strip():
+                        entries.append(dict(entry))
+                elif entry and str(entry).strip():
+                    entries.append({"input_path": str(entry).strip()})
+        patterns = payload.get("input_glob")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if isinstance(patterns, list):
+            for pattern in patterns:
+                if not pattern:
+                    continue
+                for path in sorted(glob.glob(str(pattern), recursive=True)):
+                    if os.path.isfile(path):
+                        entries.append({"input_path": path})
+        seen = set()
+        unique = []
+        for entry in entries:
+            key = os.path.abspath(str(entry["input_path"]).strip())
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(entry)
+        return unique
+
+    @staticmethod
+    def _strip_extension(name):
+        lowered = name.lower()
+        for suffix in MULTI_EXTENSIONS:
+            if lowered.endswith(suffix):
+                return name[: -len(suffix)]
+        return os.path.splitext(name)[0]
+
+    def _build_item_payload(self, payload, entry, output_format):
+        item = {key: value for key, value in payload.items() if key not in self._SHARED_KEYS_SKIP}
+        item.update(entry)
+        input_path = str(item.get("input_path") or "").strip()
+        item["input_path"] = input_path
+        if not str(item.get("output_path") or "").strip():
+            output_dir = str(payload.get("output_dir") or "").strip() or os.path.dirname(input_path)
+            name = self._strip_extension(os.path.basename(input_path))
+            item["output_path"] = os.path.join(output_dir, f"{name}.{output_format}")
+        ffmpeg_args = item.get("ffmpeg_args")
+        if isinstance(ffmpeg_args, list):
+            item["ffmpeg_args"] = [
+                str(arg).replace("{input}", input_path).replace("{output}", item["output_path"])
+                for arg in ffmpeg_args
+            ]
+        return item
+
+    def _update_item(self, index, percent, force=False):
+        with self.lock:
+            if index not in self.active:
                 return
+            self.active[index] = percent
+            self._emit_progress(force)
+
+    def _emit_progress(self, force=False):
+        total = len(self.items)
+        done = self.completed + self.failed
+        percent = 100.0 if total <= 0 else ((done * 100.0) + sum(self.active.values())) / total
+        files = [
+            {"index": index, "input_path": self.items[index]["input_path"], "percent": value}
+            for index, value in sorted(self.active.items())
+        ]
+        self.progress.emit(percent, force=force, extra={
+            "completed": self.completed,
+            "failed": self.failed,
+            "total": total,
+            "files": files
+        })
+
+    def _item_task_id(self, index):
+        return f"{self.task_id}#{index}"
+
+    def _run_item(self, index):
+        item = self.items[index]
+        if self.stop_event.is_set():
+            return index, None, "Cancelled."
+        with self.lock:
+            self.active[index] = 0.0
+        output_path = None
+        error = None
+        try:
+            if os.path.abspath(item["input_path"]) == os.path.abspath(item["output_path"]):
+                raise Exception("Output path matches input path.")
+            handler = ConvertHandler(self._item_task_id(index))
+            output_path = handler._convert(item, _BatchItemProgress(self, index))
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        return index, output_path, error
+
+    def _finish_item(self, index, output_path, error):
+        item = self.items[index]
+        result = {
+            "index": index,
+            "input_path": item["input_path"],
+            "success": error is None
+        }
+        if error is None:
+            result["output_path"] = output_path
+        else:
+            result["error"] = error
+        with self.lock:
+            self.active.pop(index, None)
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            event = {"type": "batch_item", "id": self.task_id}
+            event.update(result)
+            _emit(event)
+            self._emit_progress(force=True)
+        return result
+
+    def _cancel_items(self):
+        self.stop_event.set()
+        for index in range(len(self.items)):
+            kill_ffmpeg_for_task(self._item_task_id(index))
 
-            registered = Image.registered_extensions()
-            ext_key = f".{output_format.lower()}"
-            if ext_key not in registered and output_format in ("heic", "heif") and ".heif" in registered:
-                ext_key = ".heif"
-            if ext_key not in registered:
+    def run(self, args, payload=None):
+        self.progress = _ProgressEmitter(self.task_id)
+        try:
+            if payload is None:
+                payload = None
+                if args:
+                    try:
+                        payload = json.loads(args[0])
+                    except Exception:
+                        payload = {}
+                if payload is None:
+                    payload = {}
+
+            entries = self._resolve_inputs(payload)
+            if not entries:
                 _emit({
                     "type": "finished",
                     "id": self.task_id,
                     "success": False,
-                    "error": "Unsupported output format."
+                    "error": "No input files matched."
                 })
                 return
-            target_format = registered[ext_key]
-            if target_format not in Image.SAVE and target_format not in Image.SAVE_ALL:
+            output_format = ConvertHandler._normalize_format(payload.get("output_format"))
+            if not output_format:
                 _emit({
                     "type": "finished",
                     "id": self.task_id,
                     "success": False,
-                    "error": "Unsupported output format."
+                    "error": "Output format is missing."
                 })
                 return
 
-            output_dir = os.path.dirname(output_path)
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
-
-            progress.emit(0, force=True)
-            with Image.open(input_path) as img:
-                progress.emit(15)
-                original_size = img.size
-                target_width = self._parse_int(payload.get("image_width"))
-                target_height = self._parse_int(payload.get("image_height"))
-                target_size = self._resolve_target_size(original_size, target_width, target_height)
-                if target_size != original_size:
-                    img = img.resize(target_size, Image.LANCZOS)
-                    progress.emit(55)
-                else:
-                    progress.emit(35)
-
-                if target_format in ("JPEG", "JPG"):
-                    img = self._ensure_rgb(img)
+            self.items = [self._build_item_payload(payload, entry, output_format) for entry in entries]
+            workers = min(resolve_thread_count(payload.get("workers", "auto")), len(self.items))
+            results = []
+            self.progress.emit(0, force=True, extra={"completed": 0, "failed": 0, "total": len(self.items), "files": []})
 
-                save_kwargs = self._build_save_kwargs(target_format, payload.get("image_quality"), target_size)
-                progress.emit(80)
-                img.save(output_path, format=target_format, **save_kwargs)
-                progress.emit(100, force=True)
-
-            _emit({
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pulsar-batch")
+            try:
+                pending = {pool.submit(self._run_item, index) for index in range(len(self.items))}
+                while pending:
+                    finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        results.append(self._finish_item(*future.result()))
+            except BaseException:
+                self._cancel_items()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            pool.shutdown(wait=True)
+
+            results.sort(key=lambda result: result["index"])
+            summary = {
                 "type": "finished",
                 "id": self.task_id,
-                "success": True,
-                "output_path": output_path
-            })
+                "success": self.failed == 0,
+                "total": len(results),
+                "completed": self.completed,
+                "failed": self.failed,
+                "results": results
+            }
+            if self.failed:
+                summary["error"] = f"{self.failed} of {len(results)} files failed."
+            _emit(summary)
         except Exception as e:
             _emit({
                 "type": "finished",
                 "id": self.task_id,
                 "success": False,
                 "error": str(e)
-            })
\ No newline at end of file
+            })
@@ -1,4 +1,7 @@
+import collections
+import io
 import os
+import threading
 
 try:
     from hachoir.parser import createParser
@@ -38,67 +41,182 @@ MULTI_EXTENSIONS = {
 }
 
 
-def _probe_file_content(path):
-    if not os.path.isfile(path):
-        return None, None
-    try:
-        with open(path, "rb") as f:
-            header = f.read(64)
-    except Exception:
-        header = b""
+PROBE_SIZE = 4096
+STRONG_MAGIC_LENGTH = 4
+PROBE_CACHE_SIZE = 1024
+
+_probe_cache = collections.OrderedDict()
+_probe_cache_lock = threading.Lock()
+
+
+def _probe_riff(header):
+    form = header[8:12]
+    if form == b"WEBP":
+        return "webp", "image"
+    if form == b"WAVE":
+        return "wav", "audio"
+    if form == b"AVI ":
+        return "avi", "video"
+    return None
+
+
+def _probe_iff(header):
+    if header[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff", "audio"
+    return None
+
+
+_HEIC_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis"}
+_AVIF_BRANDS = {b"avif", b"avis"}
+_HEIF_BRANDS = {b"mif1", b"msf1"}
+_M4A_BRANDS = {b"M4A ", b"M4B ", b"M4P "}
+
+
+def _probe_ftyp(header):
+    box_size = int.from_bytes(header[0:4], "big")
+    major = header[8:12]
+    end = min(len(header), box_size if box_size >= 16 else 16)
+    brands = {header[idx:idx + 4] for idx in range(16, end - 3, 4)}
+    brands.add(major)
+    if major in _AVIF_BRANDS:
+        return "avif", "image"
+    if major in _HEIC_BRANDS:
+        return "heic", "image"
+    if major in _HEIF_BRANDS:
+        if brands & _AVIF_BRANDS:
+            return "avif", "image"
+        if brands & _HEIC_BRANDS:
+            return "heic", "image"
+        return "heif", "image"
+    if major in _M4A_BRANDS:
+        return "m4a", "audio"
+    if major == b"qt  ":
+        return "mov", "video"
+    return "mp4", "video"
+
+
+def _probe_ebml(header):
+    idx = header.find(b"\x42\x82")
+    if idx >= 0 and idx + 3 <= len(header) and header[idx + 2] & 0x80:
+        length = header[idx + 2] & 0x7F
+        if header[idx + 3:idx + 3 + length] == b"webm":
+            return "webm", "video"
+    return "mkv", "video"
+
+
+def _probe_ogg(header):
+    if len(header) < 27:
+        return "ogg", "audio"
+    packet = header[27 + header[26]:27 + header[26] + 8]
+    if packet.startswith(b"OpusHead"):
+        return "opus", "audio"
+    if packet.startswith(b"\x80theora") or packet.startswith(b"fishead"):
+        return "ogv", "video"
+    if packet.startswith(b"\x7fFLAC"):
+        return "oga", "audio"
+    return "ogg", "audio"
+
+
+def _probe_mpeg_audio(header):
+    if len(header) < 2 or (header[1] & 0xE0) != 0xE0:
+        return None
+    if (header[1] & 0x06) == 0:
+        return "aac", "audio"
+    return "mp3", "audio"
+
+
+def _probe_mpeg_ts(header):
+    if len(header) > 188 and header[188] == 0x47:
+        return "ts", "video"
+    return None
+
+
+def _probe_ico(header):
+    if len(header) < 22 or header[4:8] == b"ftyp" or header[4:6] == b"\x00\x00" or header[9] != 0:
+        return None
+    return "ico", "image"
 
-    if header:
-        if header.startswith(b"\x89PNG\r\n\x1a\n"):
-            return "png", "image"
-        if header.startswith(b"\xff\xd8\xff"):
-            return "jpg", "image"
-        if header.startswith(b"GIF87a") or header.startswith(b"GIF89a"):
-            return "gif", "image"
-        if header.startswith(b"RIFF") and len(header) >= 12 and header[8:12] == b"WEBP":
-            return "webp", "image"
-        if header.startswith(b"RIFF") and len(header) >= 12 and header[8:12] == b"WAVE":
-            return "wav", "audio"
-        if header.startswith(b"BM"):
-            return "bmp", "image"
-        if header.startswith(b"II\x2a\x00") or header.startswith(b"MM\x00\x2a"):
-            return "tiff", "image"
-        if header.startswith(b"PK\x03\x04") or header.startswith(b"PK\x05\x06"):
-            return "zip", "archive"
-        if header.startswith(b"7z\xbc\xaf\x27\x1c"):
-            return "7z", "archive"
-        if header.startswith(b"Rar!\x1a\x07"):
-            return "rar", "archive"
-        if header.startswith(b"\x1f\x8b"):
-            return "gz", "archive"
-        if header.startswith(b"BZh"):
-            return "bz2", "archive"
-        if header.startswith(b"\xfd7zXZ\x00"):
-            return "xz", "archive"
-        if header.startswith(b"\x00\x01\x00\x00") or header.startswith(b"true"):
-            return "ttf", "font"
-        if header.startswith(b"OTTO"):
-            return "otf", "font"
-        if header.startswith(b"wOFF"):
-            return "woff", "font"
-        if header.startswith(b"wOF2"):
-            return "woff2", "font"
-        if header.startswith(b"fLaC"):
-            return "flac", "audio"
-        if header.startswith(b"OggS"):
-            return "ogg", "audio"
-        if header.startswith(b"ID3") or (len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0):
-            return "mp3", "audio"
-        if len(header) >= 12 and header[4:8] == b"ftyp":
-            brand = header[8:12]
-            if brand in (b"M4A ", b"M4B ", b"M4P "):
-                return "m4a", "audio"
-            return "mp4", "video"
-        if header.startswith(b"\x1a\x45\xdf\xa3"):
-            return "mkv", "video"
-
-    if Image:
+
+def _probe_svg(header):
+    text = header.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "svg", "image"
+    return None
+
+
+_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", ("png", "image")),
+    (0, b"\xff\xd8\xff", ("jpg", "image")),
+    (0, b"GIF87a", ("gif", "image")),
+    (0, b"GIF89a", ("gif", "image")),
+    (0, b"RIFF", _probe_riff),
+    (0, b"FORM", _probe_iff),
+    (0, b"BM", ("bmp", "image")),
+    (0, b"II\x2a\x00", ("tiff", "image")),
+    (0, b"MM\x00\x2a", ("tiff", "image")),
+    (0, b"\x00\x00\x01\x00", _probe_ico),
+    (0, b"icns", ("icns", "image")),
+    (0, b"PK\x03\x04", ("zip", "archive")),
+    (0, b"PK\x05\x06", ("zip", "archive")),
+    (0, b"7z\xbc\xaf\x27\x1c", ("7z", "archive")),
+    (0, b"Rar!\x1a\x07", ("rar", "archive")),
+    (0, b"\x1f\x8b", ("gz", "archive")),
+    (0, b"BZh", ("bz2", "archive")),
+    (0, b"\xfd7zXZ\x00", ("xz", "archive")),
+    (257, b"ustar", ("tar", "archive")),
+    (0, b"\x00\x01\x00\x00", ("ttf", "font")),
+    (0, b"true", ("ttf", "font")),
+    (0, b"OTTO", ("otf", "font")),
+    (0, b"wOFF", ("woff", "font")),
+    (0, b"wOF2", ("woff2", "font")),
+    (0, b"fLaC", ("flac", "audio")),
+    (0, b"OggS", _probe_ogg),
+    (0, b"ID3", ("mp3", "audio")),
+    (0, b"\xff", _probe_mpeg_audio),
+    (4, b"ftyp", _probe_ftyp),
+    (0, b"\x1a\x45\xdf\xa3", _probe_ebml),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", ("wmv", "video")),
+    (0, b"FLV\x01", ("flv", "video")),
+    (0, b"\x00\x00\x01\xba", ("vob", "video")),
+    (0, b"\x47", _probe_mpeg_ts),
+    (0, b"<", _probe_svg),
+    (0, b"\xef\xbb\xbf", _probe_svg),
+)
+
+
+def _build_signature_index(signatures):
+    index = {}
+    for offset, magic, result in signatures:
+        weak = len(magic) < STRONG_MAGIC_LENGTH
+        index.setdefault((weak, offset), {}).setdefault(magic[0], []).append((magic, result))
+    for by_byte in index.values():
+        for candidates in by_byte.values():
+            candidates.sort(key=lambda item: len(item[0]), reverse=True)
+    return [(offset, by_byte) for (_, offset), by_byte in sorted(index.items())]
+
+
+_SIGNATURE_INDEX = _build_signature_index(_SIGNATURES)
+
+
+def _match_signature(header):
+    for offset, by_byte in _SIGNATURE_INDEX:
+        if len(header) <= offset:
+            continue
+        for magic, result in by_byte.get(header[offset], ()):
+            if header[offset:offset + len(magic)] != magic:
+                continue
+            if callable(result):
+                result = result(header)
+                if not result:
+                    continue
+            return result
+    return None
+
+
+def _probe_header_fallback(path, header):
+    if Image and header:
         try:
-            with Image.open(path) as img:
+            with Image.open(io.BytesIO(header)) as img:
                 fmt = (img.format or "").lower()
                 if fmt == "jpeg":
                     fmt = "jpg"
@@ -131,6 +249,36 @@ def _probe_file_content(path):
     return None, None
 
 
+def _probe_file_content(path):
+    try:
+        stat = os.stat(path)
+    except Exception:
+        return None, None
+    if not os.path.isfile(path):
+        return None, None
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _probe_cache_lock:
+        if key in _probe_cache:
+            _probe_cache.move_to_end(key)
+            return _probe_cache[key]
+
+    try:
+        with open(path, "rb") as f:
+            header = f.read(PROBE_SIZE)
+    except Exception:
+        header = b""
+
+    result = _match_signature(header) if header else None
+    if not result:
+        result = _probe_header_fallback(path, header)
+
+    with _probe_cache_lock:
+        _probe_cache[key] = result
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return result
+
+
 def _detect_extension(path):
     name = os.path.basename(path)
     lowered = name.lower()
@@ -7,25 +7,16 @@ from contextlib import contextmanager
 
 import yt_dlp.downloader.external as yt_external
 from System.ffmpeg_output_parser import FFMpegOutputParser
-from System.ffmpeg_runner import kill_ffmpeg_for_task
+from System.process_registry import kill_task_processes, process_group_kwargs, register_process, release_process
 from System.utils import emit_json
 
-_active_popens = {}
-_popens_lock = threading.Lock()
 _thread_local = threading.local()
 _original_popen = yt_external.Popen
 _is_patched = False
 _patch_lock = threading.Lock()
 
 def kill_processes_for_task(task_id):
-    with _popens_lock:
-        popens = _active_popens.pop(task_id, [])
-    for p in popens:
-        try:
-            p.kill()
-        except Exception:
-            pass
-    kill_ffmpeg_for_task(task_id)
+    kill_task_processes(task_id)
 
 class GlobalBridgeFFmpegPopen(_original_popen):
     def __init__(self, args, *remaining, **kwargs):
@@ -47,14 +38,13 @@ class GlobalBridgeFFmpegPopen(_original_popen):
             kwargs.setdefault("stdout", subprocess.DEVNULL)
             kwargs.setdefault("text", False)
             kwargs.setdefault("bufsize", 1024 * 64)
+            for key, value in process_group_kwargs().items():
+                kwargs.setdefault(key, value)
 
         super().__init__(args, *remaining, **kwargs)
 
         if self.task_id:
-            with _popens_lock:
-                if self.task_id not in _active_popens:
-                    _active_popens[self.task_id] = []
-                _active_popens[self.task_id].append(self)
+            register_process(self.task_id, self, "ffmpeg" if is_ffmpeg else "process", is_ffmpeg)
 
         if is_ffmpeg and self.stderr is not None:
             self._stderr_thread = threading.Thread(target=self._consume_ffmpeg_stderr, daemon=True)
@@ -115,9 +105,7 @@ class GlobalBridgeFFmpegPopen(_original_popen):
             self._stderr_thread.join(timeout=1.0)
 
         if self.task_id:
-            with _popens_lock:
-                if self.task_id in _active_popens and self in _active_popens[self.task_id]:
-                    _active_popens[self.task_id].remove(self)
+            release_process(self.task_id, self)
 
         return ret
 
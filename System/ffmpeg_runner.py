@@ -1,6 +1,14 @@
+import collections
+import re
 import subprocess
 import threading
 import time
+from System.extensions import _detect_extension
+from System.media_info import probe_media_info
+from System.process_registry import (
+    kill_all_processes, kill_task_processes, process_group_kwargs,
+    register_process, release_process, sample_processes
+)
 from System.utils import emit_json
 
 try:
@@ -8,82 +16,199 @@ try:
 except Exception:
     _FFMpegProgress = None
 
-_active_ffmpeg = {}
-_ffmpeg_lock = threading.Lock()
+STDERR_RING_LINES = 64
+STDERR_LINE_LIMIT = 1024
 
-def register_ffmpeg(task_id, process):
-    if not task_id or process is None:
-        return False
-    with _ffmpeg_lock:
-        _active_ffmpeg[task_id] = process
-    return True
+_STATS_PATTERN = re.compile(r"(frame|fps|speed)=\s*([0-9.]+)")
+
+_FAILURE_PATTERNS = (
+    ("unknown_encoder", "FFmpeg does not support the requested encoder.", ("Unknown encoder", "Encoder not found", "Unknown decoder", "Decoder not found")),
+    ("no_space", "Not enough disk space for the output file.", ("No space left on device", "Disk quota exceeded")),
+    ("invalid_data", "The input file is damaged or not a supported media file.", ("Invalid data found when processing input", "moov atom not found")),
+    ("permission_denied", "Permission denied while reading the input or writing the output.", ("Permission denied", "Operation not permitted")),
+    ("file_not_found", "FFmpeg could not find the input file.", ("No such file or directory",)),
+    ("invalid_option", "FFmpeg rejected one of the arguments.", ("Unrecognized option", "Option not found", "Error parsing options", "Invalid option")),
+)
+
+_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+class SourceDuration:
+    def __init__(self, seconds=None, input_path=None):
+        self.seconds = seconds if seconds and seconds > 0 else None
+        if self.seconds is None and input_path:
+            threading.Thread(target=self._probe, args=(input_path,), daemon=True).start()
+
+    def _probe(self, input_path):
+        try:
+            ext, _ = _detect_extension(input_path)
+            info = probe_media_info(input_path, ext)
+        except Exception:
+            info = None
+        seconds = info.get("duration_seconds") if info else None
+        if seconds and self.seconds is None:
+            self.seconds = seconds
+
+    def feed_stderr(self, line):
+        if self.seconds is not None or "Duration:" not in line:
+            return
+        match = _DURATION_PATTERN.search(line)
+        if not match:
+            return
+        seconds = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+        if seconds > 0:
+            self.seconds = seconds
+
+class FFmpegError(Exception):
+    def __init__(self, message, code="ffmpeg_failed", stderr=None):
+        super().__init__(message)
+        self.code = code
+        self.stderr = stderr or []
+
+
+class FFmpegStderr:
+    def __init__(self, listeners=(), max_lines=STDERR_RING_LINES):
+        self.lines = collections.deque(maxlen=max_lines)
+        self.listeners = [listener for listener in listeners if listener]
+        self.stats = {}
+
+    def feed(self, line):
+        for part in line.replace("\r", "\n").split("\n"):
+            part = part.strip()
+            if not part:
+                continue
+            if part.startswith("frame=") or " speed=" in part:
+                self._update_stats(part)
+                continue
+            self.lines.append(part[:STDERR_LINE_LIMIT])
+            for listener in self.listeners:
+                listener(part)
+
+    def _update_stats(self, line):
+        for key, value in _STATS_PATTERN.findall(line):
+            try:
+                self.stats[key] = float(value)
+            except Exception:
+                pass
+
+    def telemetry(self, data=None):
+        if isinstance(data, dict):
+            for key in ("fps", "speed", "frame"):
+                value = str(data.get(key) or "").strip().rstrip("x")
+                try:
+                    self.stats[key] = float(value)
+                except Exception:
+                    pass
+        return {key: self.stats[key] for key in ("fps", "speed") if self.stats.get(key)}
+
+    def classify(self):
+        lines = list(self.lines)
+        for line in reversed(lines):
+            for code, message, needles in _FAILURE_PATTERNS:
+                if any(needle in line for needle in needles):
+                    return code, message
+        return "ffmpeg_failed", lines[-1] if lines else None
+
+    def error(self, fallback):
+        code, message = self.classify()
+        if code == "ffmpeg_failed":
+            message = f"{fallback} {message}" if message else fallback
+        return FFmpegError(message, code, list(self.lines)[-10:])
+
+
+def register_ffmpeg(task_id, process, grouped=False):
+    return register_process(task_id, process, "ffmpeg", grouped)
+
+def release_ffmpeg(task_id, process):
+    release_process(task_id, process)
 
 def kill_ffmpeg_for_task(task_id):
-    with _ffmpeg_lock:
-        proc = _active_ffmpeg.pop(task_id, None)
-    if not proc:
-        return
-    try:
-        proc.kill()
-    except Exception:
-        pass
+    kill_task_processes(task_id)
 
 def kill_all_ffmpeg():
-    with _ffmpeg_lock:
-        items = list(_active_ffmpeg.items())
-        _active_ffmpeg.clear()
-    for task_id, proc in items:
+    kill_all_processes()
+
+def _parse_speed(value):
+    return float(value.rstrip(b"x"))
+
+
+def _decode(value):
+    return value.decode("ascii", "replace")
+
+
+_PROGRESS_FIELDS = {
+    b"frame": ("frame", int),
+    b"fps": ("fps", float),
+    b"speed": ("speed", _parse_speed),
+    b"total_size": ("total_size", int),
+    b"out_time_us": ("out_time_us", int),
+    b"out_time_ms": ("out_time_us", int),
+    b"out_time": ("out_time", _decode),
+    b"progress": ("progress", _decode),
+}
+
+
+class ProgressBlockParser:
+    def __init__(self, callback):
+        self.callback = callback
+        self.record = {}
+
+    def feed(self, line):
+        key, sep, value = line.partition(b"=")
+        if not sep:
+            return False
+        field = _PROGRESS_FIELDS.get(key.strip())
+        if field is None:
+            return False
+        name, cast = field
         try:
-            proc.kill()
+            self.record[name] = cast(value.strip())
         except Exception:
             pass
+        if name != "progress":
+            return False
+        record = self.record
+        self.record = {}
+        self.callback(record)
+        return record.get("progress") == "end"
 
-def _parse_progress_line(line):
-    data = {}
-    for raw in line.splitlines():
-        if "=" not in raw:
-            continue
-        key, value = raw.split("=", 1)
-        data[key.strip()] = value.strip()
-    return data
 
-def _run_ffmpeg_manual(task_id, cmd, progress_callback, timeout=None):
+def _run_ffmpeg_manual(task_id, cmd, progress_callback, timeout=None, on_stderr=None):
     proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         stdin=subprocess.DEVNULL,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-        encoding="utf-8",
-        errors="replace"
+        **process_group_kwargs()
     )
-    if not register_ffmpeg(task_id, proc):
+    if not register_ffmpeg(task_id, proc, grouped=True):
         proc.kill()
         return 1
 
     def consume_stderr():
-        for _ in proc.stderr:
-            pass
+        for line in proc.stderr:
+            if on_stderr:
+                on_stderr(line.decode("utf-8", "replace"))
 
     stderr_thread = threading.Thread(target=consume_stderr, daemon=True)
     stderr_thread.start()
 
-    for line in proc.stdout:
-        data = _parse_progress_line(line)
-        if not data:
-            continue
-        progress_callback(data)
-        if data.get("progress") == "end":
-            break
+    def on_block(record):
+        sample_processes(task_id)
+        progress_callback(record)
 
+    parser = ProgressBlockParser(on_block)
     try:
-        return proc.wait(timeout=timeout)
+        for line in proc.stdout:
+            if parser.feed(line):
+                break
+        ret = proc.wait(timeout=timeout)
+        stderr_thread.join(timeout=1)
+        return ret
     finally:
-        kill_ffmpeg_for_task(task_id)
+        release_ffmpeg(task_id, proc)
 
-def run_ffmpeg_with_progress(task_id, ffmpeg_path, args, progress_callback):
+def run_ffmpeg_with_progress(task_id, ffmpeg_path, args, progress_callback, on_stderr=None):
     cmd = [ffmpeg_path] + args + ["-progress", "pipe:1", "-nostats"]
 
     if _FFMpegProgress and hasattr(_FFMpegProgress, "run_command_with_progress"):
@@ -104,9 +229,9 @@ def run_ffmpeg_with_progress(task_id, ffmpeg_path, args, progress_callback):
                 raise RuntimeError("FFmpeg process not attached.")
             ret = proc.returncode if proc is not None else 0
             if registered:
-                kill_ffmpeg_for_task(task_id)
+                release_ffmpeg(task_id, proc)
             return ret
         except Exception:
             pass
 
-    return _run_ffmpeg_manual(task_id, cmd, progress_callback)
\ No newline at end of file
+    return _run_ffmpeg_manual(task_id, cmd, progress_callback, on_stderr=on_stderr)
\ No newline at end of file
@@ -0,0 +1,71 @@
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+ALPHA_FRAME_FORMATS = ("GIF", "PNG", "WEBP", "AVIF", "HEIF", "TIFF")
+
+
+def is_animated_image(img):
+    try:
+        return getattr(img, "n_frames", 1) > 1
+    except Exception:
+        return False
+
+
+class FrameDurations(list):
+    def __init__(self, sequence):
+        super().__init__()
+        self.sequence = sequence
+
+    def __getitem__(self, index):
+        return self.sequence.frame_duration(index)
+
+
+class ResizedFrameSequence(Image.Image if Image else object):
+    def __init__(self, source, size, mode, on_frame=None):
+        super().__init__()
+        self.source = source
+        self.target_size = size
+        self.target_mode = mode
+        self.on_frame = on_frame
+        self.n_frames = source.n_frames
+        self.is_animated = self.n_frames > 1
+        self.durations = {}
+        self.reported = -1
+        self._frame = -1
+        self.seek(0)
+
+    def frame_duration(self, index):
+        if index not in self.durations:
+            self.seek(index)
+        return self.durations[index]
+
+    def tell(self):
+        return self._frame
+
+    def seek(self, frame):
+        if frame == self._frame:
+            return
+        if frame < 0 or frame >= self.n_frames:
+            raise EOFError("no more frames")
+        self.source.seek(frame)
+        current = self.source
+        if current.mode != self.target_mode:
+            current = current.convert(self.target_mode)
+        if current.size != self.target_size:
+            current = current.resize(self.target_size, Image.LANCZOS)
+        elif current is self.source:
+            current = current.copy()
+        self.im = current.im
+        self._mode = current.mode
+        self._size = current.size
+        self.palette = current.palette
+        self.info = dict(self.source.info)
+        self.info.pop("transparency", None)
+        self._frame = frame
+        self.durations[frame] = int(self.source.info.get("duration") or 0)
+        if frame > self.reported:
+            self.reported = frame
+            if self.on_frame:
+                self.on_frame(frame + 1, self.n_frames)
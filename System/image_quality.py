@@ -0,0 +1,142 @@
+import io
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+QUALITY_FORMATS = ("JPEG", "WEBP", "AVIF", "HEIF")
+SSIM_MAX_SIDE = 512
+SSIM_WINDOW = 8
+MIN_QUALITY = 1
+MAX_QUALITY = 100
+
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+
+def luma_plane(img, max_side=SSIM_MAX_SIDE):
+    luma = img.convert("L")
+    width, height = luma.size
+    scale = max(width, height) / float(max_side)
+    if scale > 1:
+        size = (max(SSIM_WINDOW, round(width / scale)), max(SSIM_WINDOW, round(height / scale)))
+        luma = luma.resize(size, Image.BOX)
+    return np.asarray(luma, dtype=np.float64)
+
+
+def _window_means(plane):
+    summed = np.pad(plane, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    w = SSIM_WINDOW
+    total = summed[w:, w:] - summed[:-w, w:] - summed[w:, :-w] + summed[:-w, :-w]
+    return total / float(w * w)
+
+
+def ssim(reference, candidate):
+    if reference.shape[0] < SSIM_WINDOW or reference.shape[1] < SSIM_WINDOW:
+        diff = reference - candidate
+        return 1.0 - float(np.mean(diff * diff)) / (255.0 * 255.0)
+    mu_x = _window_means(reference)
+    mu_y = _window_means(candidate)
+    var_x = _window_means(reference * reference) - mu_x * mu_x
+    var_y = _window_means(candidate * candidate) - mu_y * mu_y
+    cov = _window_means(reference * candidate) - mu_x * mu_y
+    numerator = (2 * mu_x * mu_y + _SSIM_C1) * (2 * cov + _SSIM_C2)
+    denominator = (mu_x * mu_x + mu_y * mu_y + _SSIM_C1) * (var_x + var_y + _SSIM_C2)
+    return float(np.mean(numerator / denominator))
+
+
+def encode(img, fmt, quality, save_kwargs):
+    kwargs = dict(save_kwargs)
+    kwargs["quality"] = quality
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+class QualitySearch:
+    def __init__(self, img, fmt, save_kwargs, target_bytes=None, target_ssim=None, on_step=None):
+        if fmt not in QUALITY_FORMATS:
+            raise Exception("Target size or SSIM needs a lossy output format (JPEG, WebP, AVIF, HEIF).")
+        if target_ssim is not None and np is None:
+            raise Exception("SSIM targeting requires numpy.")
+        self.img = img
+        self.fmt = fmt
+        self.save_kwargs = save_kwargs
+        self.target_bytes = target_bytes
+        self.target_ssim = target_ssim
+        self.on_step = on_step
+        self.reference = luma_plane(img) if target_ssim is not None else None
+        self.steps = 0
+        self.results = {}
+        self.best_data = (None, None)
+
+    def measure(self, quality):
+        if quality in self.results:
+            return self.results[quality]
+        data = encode(self.img, self.fmt, quality, self.save_kwargs)
+        score = None
+        if self.reference is not None:
+            with Image.open(io.BytesIO(data)) as decoded:
+                candidate = decoded.convert("L")
+                if candidate.size != (self.reference.shape[1], self.reference.shape[0]):
+                    candidate = candidate.resize((self.reference.shape[1], self.reference.shape[0]), Image.BOX)
+                score = ssim(self.reference, np.asarray(candidate, dtype=np.float64))
+        self.steps += 1
+        if self.on_step:
+            self.on_step(self.steps)
+        result = (len(data), score)
+        self.results[quality] = result
+        self.best_data = (quality, data)
+        return result
+
+    def _search(self, low, high, accept, want_highest):
+        found = None
+        while low <= high:
+            mid = (low + high) // 2
+            if accept(self.measure(mid)):
+                found = mid
+                if want_highest:
+                    low = mid + 1
+                else:
+                    high = mid - 1
+            elif want_highest:
+                high = mid - 1
+            else:
+                low = mid + 1
+        return found
+
+    def run(self):
+        quality = None
+        if self.target_ssim is not None:
+            quality = self._search(MIN_QUALITY, MAX_QUALITY, lambda r: r[1] >= self.target_ssim, False)
+            if quality is None:
+                quality = MAX_QUALITY
+        if self.target_bytes is not None:
+            fits = lambda r: r[0] <= self.target_bytes
+            if quality is None or not fits(self.measure(quality)):
+                upper = quality if quality is not None else MAX_QUALITY
+                quality = self._search(MIN_QUALITY, upper, fits, True)
+                if quality is None:
+                    quality = MIN_QUALITY
+        size, score = self.measure(quality)
+        if self.best_data[0] != quality:
+            self.best_data = (quality, encode(self.img, self.fmt, quality, self.save_kwargs))
+        met = True
+        if self.target_bytes is not None and size > self.target_bytes:
+            met = False
+        if self.target_ssim is not None and (score is None or score < self.target_ssim):
+            met = False
+        return {
+            "quality": quality,
+            "data": self.best_data[1],
+            "size": size,
+            "ssim": score,
+            "met": met,
+            "encodes": self.steps
+        }
@@ -0,0 +1,204 @@
+import os
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+DEFAULT_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+MIN_MEMORY_BUDGET = 64 * 1024 * 1024
+
+MODE_PIXEL_BYTES = {
+    "1": 1,
+    "L": 1,
+    "P": 1,
+    "I;16": 2,
+    "I;16L": 2,
+    "I;16B": 2,
+    "I;16N": 2,
+}
+
+_STRIP_DECODERS = ("raw", "packbits")
+
+_RAW_MODE_BITS = {
+    "1": 1,
+    "1;I": 1,
+    "L": 8,
+    "P": 8,
+    "I;16": 16,
+    "I;16B": 16,
+    "I;16L": 16,
+    "I;32": 32,
+    "I;32B": 32,
+    "F;32F": 32,
+    "F;32BF": 32,
+}
+
+
+def resolve_memory_budget(value):
+    if value is not None:
+        try:
+            megabytes = float(value)
+        except Exception:
+            megabytes = None
+        if megabytes is not None and megabytes > 0:
+            return max(MIN_MEMORY_BUDGET, int(megabytes * 1024 * 1024))
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except Exception:
+        physical = 0
+    if physical > 0:
+        return max(MIN_MEMORY_BUDGET, physical // 2)
+    return DEFAULT_MEMORY_BUDGET
+
+
+def estimate_image_bytes(mode, size):
+    return size[0] * size[1] * MODE_PIXEL_BYTES.get(mode, 4)
+
+
+def _raw_row_bytes(rawmode, width):
+    bits = _RAW_MODE_BITS.get(rawmode)
+    if bits is None:
+        if not rawmode or not rawmode.isalpha() or not set(rawmode) <= set("RGBAXLCMYKPa"):
+            return None
+        bits = 8 * len(rawmode)
+    return (width * bits + 7) // 8
+
+
+def _split_raw_tile(tile, size):
+    name, extents, offset, args = tile
+    if isinstance(args, str):
+        args = (args,)
+    args = tuple(args)
+    rawmode = args[0]
+    stride = args[1] if len(args) > 1 else 0
+    ydir = args[2] if len(args) > 2 else 1
+    x0, y0, x1, y1 = extents
+    if (x0, y0, x1, y1) != (0, 0, size[0], size[1]) or ydir not in (1, -1):
+        return None
+    if not stride:
+        stride = _raw_row_bytes(rawmode, size[0])
+        if not stride:
+            return None
+    height = size[1]
+
+    def make(top, rows):
+        if ydir == 1:
+            start = offset + top * stride
+        else:
+            start = offset + (height - top - rows) * stride
+        return [(name, (0, top, size[0], top + rows), start, (rawmode, stride, ydir) + tuple(args[3:]))]
+
+    return make
+
+
+def _tile_row_groups(tiles):
+    groups = {}
+    for tile in tiles:
+        name, extents = tile[0], tile[1]
+        if name not in _STRIP_DECODERS:
+            return None
+        groups.setdefault((extents[1], extents[3]), []).append(tile)
+    ordered = sorted(groups.items())
+    expected = 0
+    for (top, bottom), _ in ordered:
+        if top != expected or bottom <= top:
+            return None
+        expected = bottom
+    return ordered
+
+
+def can_decode_in_strips(img):
+    if Image is None or not getattr(img, "filename", None) or getattr(img, "use_load_libtiff", False):
+        return False
+    if getattr(img, "_tile_orientation", None) not in (None, 1):
+        return False
+    tiles = list(getattr(img, "tile", None) or ())
+    if not tiles or getattr(img, "n_frames", 1) > 1 or not hasattr(Image.Image, "reduce"):
+        return False
+    if len(tiles) == 1:
+        return tiles[0][0] == "raw" and _split_raw_tile(tiles[0], img.size) is not None
+    return _tile_row_groups(tiles) is not None
+
+
+def _iter_bands(img, band_rows):
+    width, height = img.size
+    tiles = [tuple(tile) for tile in img.tile]
+    if len(tiles) == 1:
+        make = _split_raw_tile(tiles[0], img.size)
+        top = 0
+        while top < height:
+            rows = min(band_rows, height - top)
+            yield top, rows, make(top, rows)
+            top += rows
+        return
+    pending = []
+    pending_top = 0
+    pending_rows = 0
+    for (top, bottom), group in _tile_row_groups(tiles):
+        bottom = min(bottom, height)
+        if not pending:
+            pending_top = top
+        pending.extend(group)
+        pending_rows = bottom - pending_top
+        if pending_rows >= band_rows:
+            yield pending_top, pending_rows, pending
+            pending = []
+    if pending:
+        yield pending_top, pending_rows, pending
+
+
+def _load_band(img, top, rows, tiles):
+    band = Image.open(img.filename, formats=[img.format] if img.format else None)
+    try:
+        band._size = (img.size[0], rows)
+        if hasattr(band, "_tile_size"):
+            band._tile_size = band._size
+        band.tile = [
+            (name, (x0, y0 - top, x1, min(y1, top + rows) - top), offset, args)
+            for name, (x0, y0, x1, y1), offset, args in tiles
+        ]
+        band.load()
+        return band.copy() if band.mode not in ("P", "1") else band.convert(_reduce_mode(band))
+    finally:
+        band.close()
+
+
+def _reduce_mode(img):
+    if img.mode == "1":
+        return "L"
+    if img.mode == "P":
+        return "RGBA" if "transparency" in img.info else "RGB"
+    return img.mode
+
+
+def reduce_in_strips(img, factor, budget, on_progress=None):
+    width, height = img.size
+    mode = _reduce_mode(img)
+    out_size = (-(-width // factor), -(-height // factor))
+    row_bytes = max(1, estimate_image_bytes(img.mode, (width, 1)), estimate_image_bytes(mode, (width, 1)))
+    band_budget = max(0, budget - estimate_image_bytes(mode, out_size)) // 4
+    band_rows = max(factor, (band_budget // row_bytes) // factor * factor)
+    out = Image.new(mode, out_size)
+    out_top = 0
+    carry = None
+    for top, rows, tiles in _iter_bands(img, band_rows):
+        band = _load_band(img, top, rows, tiles)
+        if carry is not None:
+            merged = Image.new(mode, (width, carry.size[1] + band.size[1]))
+            merged.paste(carry, (0, 0))
+            merged.paste(band, (0, carry.size[1]))
+            band = merged
+            carry = None
+        usable = (band.size[1] // factor) * factor
+        if usable:
+            reduced = band.crop((0, 0, width, usable)).reduce(factor)
+            out.paste(reduced, (0, out_top))
+            out_top += reduced.size[1]
+        if usable < band.size[1]:
+            carry = band.crop((0, usable, width, band.size[1]))
+        if on_progress:
+            on_progress(top + rows, height)
+    if carry is not None:
+        out.paste(carry.reduce(factor), (0, out_top))
+    return out
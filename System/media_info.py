@@ -0,0 +1,674 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+
+MP4_MAX_MOOV_SIZE = 64 * 1024 * 1024
+MKV_MAX_HEADER_SCAN = 16 * 1024 * 1024
+OGG_TAIL_SIZE = 64 * 1024
+MP3_SCAN_SIZE = 64 * 1024
+FFPROBE_TIMEOUT = 15
+PROBE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "pulsar-probe-cache")
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+
+_CODEC_ALIASES = {
+    "avc1": "h264", "avc3": "h264", "V_MPEG4/ISO/AVC": "h264",
+    "hvc1": "hevc", "hev1": "hevc", "V_MPEGH/ISO/HEVC": "hevc",
+    "av01": "av1", "V_AV1": "av1",
+    "vp09": "vp9", "V_VP9": "vp9", "V_VP8": "vp8",
+    "mp4v": "mpeg4", "V_MPEG4/ISO/ASP": "mpeg4",
+    "mp4a": "aac", "A_AAC": "aac",
+    "Opus": "opus", "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "fLaC": "flac", "A_FLAC": "flac",
+    ".mp3": "mp3", "A_MPEG/L3": "mp3",
+    "ac-3": "ac3", "A_AC3": "ac3",
+    "ec-3": "eac3", "A_EAC3": "eac3",
+    "alac": "alac",
+}
+
+
+def _normalize_codec(codec):
+    if not codec:
+        return None
+    codec = str(codec)
+    return _CODEC_ALIASES.get(codec, codec.lower())
+
+
+def _new_info(container):
+    return {
+        "container": container,
+        "duration_seconds": None,
+        "width": None,
+        "height": None,
+        "video_codec": None,
+        "audio_codec": None,
+        "sample_rate": None,
+        "channels": None,
+        "bitrate": None,
+    }
+
+
+def _finish_info(info, size):
+    duration = info.get("duration_seconds")
+    if duration is not None and duration <= 0:
+        info["duration_seconds"] = duration = None
+    if info.get("bitrate") is None and duration and size:
+        info["bitrate"] = int(size * 8 / duration)
+    info["duration_ms"] = int(round(duration * 1000)) if duration else None
+    info["video_codec"] = _normalize_codec(info.get("video_codec"))
+    info["audio_codec"] = _normalize_codec(info.get("audio_codec"))
+    return info
+
+
+def _iter_mp4_boxes(data, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _find_mp4_moov(handle, file_size):
+    pos = 0
+    while pos + 8 <= file_size:
+        handle.seek(pos)
+        head = handle.read(16)
+        if len(head) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", head[:8])
+        header = 8
+        if size == 1 and len(head) >= 16:
+            size = struct.unpack(">Q", head[8:16])[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            return None
+        if kind == b"moov":
+            if size - header > MP4_MAX_MOOV_SIZE:
+                return None
+            handle.seek(pos + header)
+            return handle.read(size - header)
+        pos += size
+    return None
+
+
+def _parse_mp4_track(data, start, end, info):
+    handler = None
+    width = height = None
+    codec = None
+    sample_rate = channels = None
+    for kind, body, box_end in _iter_mp4_boxes(data, start, end):
+        if kind == b"tkhd":
+            offset = body + (88 if data[body] == 1 else 76)
+            if offset + 8 <= box_end:
+                width = struct.unpack(">I", data[offset:offset + 4])[0] >> 16
+                height = struct.unpack(">I", data[offset + 4:offset + 8])[0] >> 16
+        elif kind == b"mdia":
+            for mkind, mbody, mend in _iter_mp4_boxes(data, body, box_end):
+                if mkind == b"hdlr" and mbody + 12 <= mend:
+                    handler = data[mbody + 8:mbody + 12]
+                elif mkind == b"minf":
+                    for nkind, nbody, nend in _iter_mp4_boxes(data, mbody, mend):
+                        if nkind != b"stbl":
+                            continue
+                        for skind, sbody, send in _iter_mp4_boxes(data, nbody, nend):
+                            if skind != b"stsd" or sbody + 16 > send:
+                                continue
+                            entry = sbody + 8
+                            codec = data[entry + 4:entry + 8].decode("latin-1").strip()
+                            if entry + 36 <= send:
+                                channels = struct.unpack(">H", data[entry + 24:entry + 26])[0]
+                                sample_rate = struct.unpack(">I", data[entry + 32:entry + 36])[0] >> 16
+    if handler == b"vide":
+        if info["video_codec"] is None:
+            info["video_codec"] = codec
+            if width and height:
+                info["width"], info["height"] = width, height
+    elif handler == b"soun":
+        if info["audio_codec"] is None:
+            info["audio_codec"] = codec
+            info["sample_rate"] = sample_rate or None
+            info["channels"] = channels or None
+
+
+def _probe_mp4(handle, file_size):
+    moov = _find_mp4_moov(handle, file_size)
+    if moov is None:
+        return None
+    info = _new_info("mp4")
+    for kind, body, end in _iter_mp4_boxes(moov, 0, len(moov)):
+        if kind == b"mvhd":
+            if moov[body] == 1 and body + 32 <= end:
+                timescale, duration = struct.unpack(">IQ", moov[body + 20:body + 32])
+            elif body + 20 <= end:
+                timescale, duration = struct.unpack(">II", moov[body + 12:body + 20])
+            else:
+                continue
+            if timescale and duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                info["duration_seconds"] = duration / float(timescale)
+        elif kind == b"trak":
+            _parse_mp4_track(moov, body, end, info)
+    return info
+
+
+def _read_ebml_vint(handle, keep_marker=False):
+    first = handle.read(1)
+    if not first:
+        return None, 0
+    byte = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not byte & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        return None, 0
+    value = byte if keep_marker else byte & (mask - 1)
+    rest = handle.read(length - 1)
+    if len(rest) != length - 1:
+        return None, 0
+    all_ones = (byte & (mask - 1)) == mask - 1 and all(b == 0xFF for b in rest)
+    for b in rest:
+        value = (value << 8) | b
+    if not keep_marker and all_ones:
+        return -1, length
+    return value, length
+
+
+def _iter_ebml(handle, end):
+    while handle.tell() < end:
+        element_id, _ = _read_ebml_vint(handle, keep_marker=True)
+        size, _ = _read_ebml_vint(handle)
+        if element_id is None or size is None:
+            return
+        start = handle.tell()
+        yield element_id, start, (end if size < 0 else start + size)
+
+
+def _read_ebml_uint(handle, start, end):
+    handle.seek(start)
+    data = handle.read(min(8, end - start))
+    value = 0
+    for b in data:
+        value = (value << 8) | b
+    return value
+
+
+def _read_ebml_float(handle, start, end):
+    handle.seek(start)
+    data = handle.read(end - start)
+    if len(data) == 4:
+        return struct.unpack(">f", data)[0]
+    if len(data) == 8:
+        return struct.unpack(">d", data)[0]
+    return None
+
+
+def _parse_mkv_track(handle, start, end, info):
+    track_type = None
+    codec = None
+    width = height = None
+    sample_rate = channels = None
+    handle.seek(start)
+    for element_id, body, element_end in _iter_ebml(handle, end):
+        if element_id == 0x83:
+            track_type = _read_ebml_uint(handle, body, element_end)
+        elif element_id == 0x86:
+            handle.seek(body)
+            codec = handle.read(element_end - body).decode("ascii", "replace").strip("\x00")
+        elif element_id == 0xE0:
+            handle.seek(body)
+            for child_id, child_body, child_end in _iter_ebml(handle, element_end):
+                if child_id == 0xB0:
+                    width = _read_ebml_uint(handle, child_body, child_end)
+                elif child_id == 0xBA:
+                    height = _read_ebml_uint(handle, child_body, child_end)
+                handle.seek(child_end)
+        elif element_id == 0xE1:
+            handle.seek(body)
+            for child_id, child_body, child_end in _iter_ebml(handle, element_end):
+                if child_id == 0xB5:
+                    sample_rate = _read_ebml_float(handle, child_body, child_end)
+                elif child_id == 0x9F:
+                    channels = _read_ebml_uint(handle, child_body, child_end)
+                handle.seek(child_end)
+        handle.seek(element_end)
+    if track_type == 1 and info["video_codec"] is None:
+        info["video_codec"] = codec
+        info["width"], info["height"] = width, height
+    elif track_type == 2 and info["audio_codec"] is None:
+        info["audio_codec"] = codec
+        info["sample_rate"] = int(sample_rate) if sample_rate else 8000
+        info["channels"] = channels or 1
+
+
+def _probe_mkv(handle, file_size):
+    handle.seek(0)
+    info = _new_info("mkv")
+    segment = None
+    for element_id, body, end in _iter_ebml(handle, file_size):
+        if element_id == 0x1A45DFA3:
+            handle.seek(body)
+            for child_id, child_body, child_end in _iter_ebml(handle, end):
+                if child_id == 0x4282:
+                    handle.seek(child_body)
+                    if handle.read(child_end - child_body).rstrip(b"\x00") == b"webm":
+                        info["container"] = "webm"
+                handle.seek(child_end)
+        elif element_id == 0x18538067:
+            segment = (body, min(end, file_size))
+            break
+        handle.seek(end)
+    if segment is None:
+        return None
+    scale = 1000000
+    duration = None
+    found_tracks = False
+    handle.seek(segment[0])
+    for element_id, body, end in _iter_ebml(handle, segment[1]):
+        if element_id == 0x1549A966:
+            handle.seek(body)
+            for child_id, child_body, child_end in _iter_ebml(handle, end):
+                if child_id == 0x2AD7B1:
+                    scale = _read_ebml_uint(handle, child_body, child_end) or scale
+                elif child_id == 0x4489:
+                    duration = _read_ebml_float(handle, child_body, child_end)
+                handle.seek(child_end)
+        elif element_id == 0x1654AE6B:
+            found_tracks = True
+            handle.seek(body)
+            for child_id, child_body, child_end in _iter_ebml(handle, end):
+                if child_id == 0xAE:
+                    _parse_mkv_track(handle, child_body, child_end, info)
+                handle.seek(child_end)
+        elif element_id == 0x1F43B675:
+            break
+        if duration is not None and found_tracks:
+            break
+        if body - segment[0] > MKV_MAX_HEADER_SCAN:
+            break
+        handle.seek(end)
+    if duration is not None:
+        info["duration_seconds"] = duration * scale / 1e9
+    return info
+
+
+def _skip_id3(handle):
+    handle.seek(0)
+    head = handle.read(10)
+    if len(head) == 10 and head.startswith(b"ID3"):
+        size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        return 10 + size + (10 if head[5] & 0x10 else 0)
+    return 0
+
+
+def _probe_mp3(handle, file_size):
+    start = _skip_id3(handle)
+    handle.seek(start)
+    data = handle.read(MP3_SCAN_SIZE)
+    pos = 0
+    while pos + 4 <= len(data):
+        if data[pos] == 0xFF and (data[pos + 1] & 0xE0) == 0xE0:
+            version_bits = (data[pos + 1] >> 3) & 0x03
+            layer_bits = (data[pos + 1] >> 1) & 0x03
+            bitrate_index = data[pos + 2] >> 4
+            rate_index = (data[pos + 2] >> 2) & 0x03
+            if version_bits != 1 and layer_bits and bitrate_index not in (0, 15) and rate_index != 3:
+                break
+        pos += 1
+    else:
+        return None
+    version = 1 if version_bits == 3 else 2
+    layer = 4 - layer_bits
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    bitrate = _MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+    mono = (data[pos + 3] >> 6) == 3
+    if layer == 1:
+        samples = 384
+    elif layer == 3 and version == 2:
+        samples = 576
+    else:
+        samples = 1152
+    info = _new_info("mp3")
+    info["audio_codec"] = "mp3" if layer == 3 else f"mp{layer}"
+    info["sample_rate"] = sample_rate
+    info["channels"] = 1 if mono else 2
+    if version == 1:
+        side = 17 if mono else 32
+    else:
+        side = 9 if mono else 17
+    frames = None
+    xing = pos + 4 + side
+    if data[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(data):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    vbri = pos + 4 + 32
+    if frames is None and data[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(data):
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+    audio_bytes = max(0, file_size - start - pos)
+    if frames:
+        info["duration_seconds"] = frames * samples / float(sample_rate)
+    elif bitrate:
+        info["duration_seconds"] = audio_bytes * 8 / float(bitrate)
+        info["bitrate"] = bitrate
+    return info
+
+
+def _probe_flac(handle, file_size):
+    handle.seek(4)
+    while True:
+        head = handle.read(4)
+        if len(head) < 4:
+            return None
+        block_type = head[0] & 0x7F
+        length = int.from_bytes(head[1:4], "big")
+        if block_type == 0:
+            block = handle.read(length)
+            if len(block) < 18:
+                return None
+            packed = int.from_bytes(block[10:18], "big")
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x07) + 1
+            total_samples = packed & 0xFFFFFFFFF
+            info = _new_info("flac")
+            info["audio_codec"] = "flac"
+            info["sample_rate"] = sample_rate
+            info["channels"] = channels
+            if sample_rate and total_samples:
+                info["duration_seconds"] = total_samples / float(sample_rate)
+            return info
+        if head[0] & 0x80:
+            return None
+        handle.seek(length, os.SEEK_CUR)
+
+
+def _probe_ogg(handle, file_size):
+    handle.seek(0)
+    head = handle.read(4096)
+    if len(head) < 28 or not head.startswith(b"OggS"):
+        return None
+    packet = head[27 + head[26]:]
+    info = _new_info("ogg")
+    pre_skip = 0
+    rate = None
+    if packet.startswith(b"OpusHead") and len(packet) >= 19:
+        info["audio_codec"] = "opus"
+        info["channels"] = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        info["sample_rate"] = struct.unpack("<I", packet[12:16])[0] or 48000
+        rate = 48000
+    elif packet.startswith(b"\x01vorbis") and len(packet) >= 16:
+        info["audio_codec"] = "vorbis"
+        info["channels"] = packet[11]
+        rate = info["sample_rate"] = struct.unpack("<I", packet[12:16])[0]
+    elif packet.startswith(b"\x7fFLAC") and len(packet) >= 30:
+        info["audio_codec"] = "flac"
+        packed = int.from_bytes(packet[27:35], "big")
+        rate = info["sample_rate"] = packed >> 44
+        info["channels"] = ((packed >> 41) & 0x07) + 1
+    elif packet.startswith(b"\x80theora"):
+        info["video_codec"] = "theora"
+        return info
+    if not rate:
+        return info
+    handle.seek(max(0, file_size - OGG_TAIL_SIZE))
+    tail = handle.read(OGG_TAIL_SIZE)
+    idx = tail.rfind(b"OggS")
+    while idx >= 0:
+        if idx + 14 <= len(tail):
+            granule = struct.unpack("<q", tail[idx + 6:idx + 14])[0]
+            if granule > 0:
+                info["duration_seconds"] = max(0, granule - pre_skip) / float(rate)
+                break
+        idx = tail.rfind(b"OggS", 0, idx)
+    return info
+
+
+def _probe_wav(handle, file_size):
+    handle.seek(12)
+    info = _new_info("wav")
+    byte_rate = None
+    while True:
+        head = handle.read(8)
+        if len(head) < 8:
+            break
+        kind, size = struct.unpack("<4sI", head)
+        if kind == b"fmt ":
+            fmt = handle.read(size)
+            if len(fmt) >= 16:
+                tag, channels, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+                bits = struct.unpack("<H", fmt[14:16])[0]
+                if tag in (1, 0xFFFE):
+                    info["audio_codec"] = "pcm_u8" if bits == 8 else f"pcm_s{bits}le"
+                elif tag == 3:
+                    info["audio_codec"] = f"pcm_f{bits}le"
+                else:
+                    info["audio_codec"] = f"wav_0x{tag:04x}"
+                info["channels"] = channels
+                info["sample_rate"] = sample_rate
+                info["bitrate"] = byte_rate * 8
+            handle.seek(size & 1, os.SEEK_CUR)
+            continue
+        if kind == b"data":
+            if size == 0xFFFFFFFF or handle.tell() + size > file_size:
+                size = file_size - handle.tell()
+            if byte_rate:
+                info["duration_seconds"] = size / float(byte_rate)
+            break
+        handle.seek(size + (size & 1), os.SEEK_CUR)
+    return info
+
+
+_PROBERS = {
+    "mp4": _probe_mp4,
+    "mov": _probe_mp4,
+    "m4a": _probe_mp4,
+    "m4v": _probe_mp4,
+    "mkv": _probe_mkv,
+    "webm": _probe_mkv,
+    "mp3": _probe_mp3,
+    "flac": _probe_flac,
+    "ogg": _probe_ogg,
+    "oga": _probe_ogg,
+    "opus": _probe_ogg,
+    "wav": _probe_wav,
+}
+
+
+def probe_media_info(path, ext):
+    prober = _PROBERS.get((ext or "").lower())
+    if not prober:
+        return None
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as handle:
+            info = prober(handle, file_size)
+    except Exception:
+        return None
+    if info is None:
+        return None
+    return _finish_info(info, file_size)
+
+
+def ffprobe_duration(path, ffprobe_path=None, timeout=FFPROBE_TIMEOUT):
+    ffprobe_path = ffprobe_path or shutil.which("ffprobe")
+    if not ffprobe_path:
+        return None
+    cmd = [
+        ffprobe_path, "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout
+        )
+        duration = float(result.stdout.decode("utf-8", "ignore").strip())
+    except Exception:
+        return None
+    return duration if duration > 0 else None
+
+
+def resolve_ffprobe_path(ffprobe_path=None, ffmpeg_path=None):
+    if ffprobe_path:
+        return ffprobe_path
+    if ffmpeg_path:
+        folder, name = os.path.split(ffmpeg_path)
+        candidate = os.path.join(folder, name.lower().replace("ffmpeg", "ffprobe"))
+        if candidate != ffmpeg_path and os.path.isfile(candidate):
+            return candidate
+    return shutil.which("ffprobe")
+
+
+def _parse_frame_rate(value):
+    try:
+        num, _, den = str(value).partition("/")
+        rate = float(num) / float(den or 1)
+    except Exception:
+        return None
+    return round(rate, 3) if rate > 0 else None
+
+
+def _parse_number(value, cast=float):
+    try:
+        parsed = cast(float(value))
+    except Exception:
+        return None
+    return parsed if parsed > 0 else None
+
+
+def _normalize_ffprobe(raw):
+    fmt = raw.get("format") or {}
+    info = {
+        "container": (fmt.get("format_name") or "").split(",")[0] or None,
+        "duration_seconds": _parse_number(fmt.get("duration")),
+        "bitrate": _parse_number(fmt.get("bit_rate"), int),
+        "streams": []
+    }
+    for stream in raw.get("streams") or []:
+        kind = stream.get("codec_type")
+        entry = {
+            "index": stream.get("index"),
+            "type": kind,
+            "codec": _normalize_codec(stream.get("codec_name")),
+            "profile": stream.get("profile"),
+            "bitrate": _parse_number(stream.get("bit_rate"), int),
+            "language": (stream.get("tags") or {}).get("language")
+        }
+        if kind == "video":
+            entry["width"] = stream.get("width")
+            entry["height"] = stream.get("height")
+            entry["pix_fmt"] = stream.get("pix_fmt")
+            entry["frame_rate"] = _parse_frame_rate(stream.get("avg_frame_rate")) or _parse_frame_rate(stream.get("r_frame_rate"))
+        elif kind == "audio":
+            entry["sample_rate"] = _parse_number(stream.get("sample_rate"), int)
+            entry["channels"] = stream.get("channels")
+            entry["channel_layout"] = stream.get("channel_layout")
+        info["streams"].append({k: v for k, v in entry.items() if v is not None})
+    video = next((s for s in info["streams"] if s.get("type") == "video"), None)
+    audio = next((s for s in info["streams"] if s.get("type") == "audio"), None)
+    if video:
+        info["video_codec"] = video.get("codec")
+        info["width"] = video.get("width")
+        info["height"] = video.get("height")
+        info["frame_rate"] = video.get("frame_rate")
+    if audio:
+        info["audio_codec"] = audio.get("codec")
+        info["sample_rate"] = audio.get("sample_rate")
+        info["channels"] = audio.get("channels")
+    if info["duration_seconds"]:
+        info["duration_ms"] = int(round(info["duration_seconds"] * 1000))
+    return {k: v for k, v in info.items() if v is not None}
+
+
+def _cache_path(cache_dir, path):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest() + ".json")
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except Exception:
+        return None
+
+
+def _write_cache(cache_file, info):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as handle:
+            json.dump(info, handle)
+        os.replace(temp_file, cache_file)
+    except Exception:
+        pass
+
+
+def ffprobe_media_info(path, ffprobe_path=None, timeout=FFPROBE_TIMEOUT, cache_dir=PROBE_CACHE_DIR):
+    cache_file = _cache_path(cache_dir, path) if cache_dir else None
+    if cache_file:
+        cached = _read_cache(cache_file)
+        if cached is not None:
+            return cached
+    ffprobe_path = ffprobe_path or shutil.which("ffprobe")
+    if not ffprobe_path:
+        raise Exception("ffprobe not found")
+    cmd = [
+        ffprobe_path, "-v", "error",
+        "-print_format", "json",
+        "-show_format", "-show_streams",
+        path
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise Exception(f"ffprobe timed out after {timeout}s")
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise Exception(message[-1] if message else f"ffprobe exited with code {result.returncode}")
+    info = _normalize_ffprobe(json.loads(result.stdout.decode("utf-8", "replace") or "{}"))
+    if cache_file:
+        _write_cache(cache_file, info)
+    return info
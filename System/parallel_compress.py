@@ -0,0 +1,156 @@
+import bz2
+import collections
+import lzma
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+DEFLATE_BLOCK_SIZE = 1024 * 1024
+BZ2_BLOCK_SIZE = 900 * 1024
+XZ_BLOCK_SIZE = 16 * 1024 * 1024
+DEFLATE_DICT_SIZE = 32 * 1024
+MAX_THREADS = 64
+
+_BLOCK_SIZES = {
+    "gz": DEFLATE_BLOCK_SIZE,
+    "bz2": BZ2_BLOCK_SIZE,
+    "xz": XZ_BLOCK_SIZE,
+}
+
+
+def resolve_thread_count(value):
+    if value is None:
+        return 1
+    raw = str(value).strip().lower()
+    if raw in ("auto", "0"):
+        return max(1, min(os.cpu_count() or 1, MAX_THREADS))
+    try:
+        count = int(raw)
+    except Exception:
+        return 1
+    return max(1, min(count, MAX_THREADS))
+
+
+def deflate_block(data, zdict=None, level=-1):
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 8, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def deflate_final_block(level=-1):
+    return zlib.compressobj(level, zlib.DEFLATED, -15).flush()
+
+
+class OrderedPipeline:
+    def __init__(self, threads, max_inflight=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pulsar-compress")
+        self.max_inflight = max_inflight or threads * 2
+        self.items = collections.deque()
+        self.inflight = 0
+
+    def submit(self, callback, fn=None, *args):
+        future = None
+        if fn is not None:
+            future = self.pool.submit(fn, *args)
+            self.inflight += 1
+        self.items.append((future, callback))
+        self._drain()
+
+    def _drain(self, block=False):
+        while self.items:
+            future, callback = self.items[0]
+            if future is not None and not future.done():
+                if not block and self.inflight <= self.max_inflight:
+                    break
+            self.items.popleft()
+            result = None
+            if future is not None:
+                result = future.result()
+                self.inflight -= 1
+            callback(result)
+
+    def flush(self):
+        self._drain(block=True)
+
+    def close(self, cancel=False):
+        if cancel:
+            self.items.clear()
+        self.pool.shutdown(wait=True, cancel_futures=cancel)
+
+
+class ParallelCompressedWriter:
+    def __init__(self, path, fmt, threads, level=None):
+        if fmt not in _BLOCK_SIZES:
+            raise Exception("Unsupported parallel compression format.")
+        self.fmt = fmt
+        self.level = level
+        self.block_size = _BLOCK_SIZES[fmt]
+        self.handle = open(path, "wb")
+        self.pipeline = OrderedPipeline(threads)
+        self.buffer = bytearray()
+        self.blocks = 0
+        self.crc = 0
+        self.size = 0
+        self.tail = b""
+        self.closed = False
+        if fmt == "gz":
+            self.handle.write(b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time())) + b"\x00\xff")
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            block = bytes(self.buffer[:self.block_size])
+            del self.buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block):
+        self.blocks += 1
+        if self.fmt == "gz":
+            level = -1 if self.level is None else self.level
+            self.crc = zlib.crc32(block, self.crc)
+            self.size += len(block)
+            zdict, self.tail = self.tail, block[-DEFLATE_DICT_SIZE:]
+            self.pipeline.submit(self.handle.write, deflate_block, block, zdict, level)
+        elif self.fmt == "xz":
+            preset = 6 if self.level is None else self.level
+            self.pipeline.submit(self.handle.write, lzma.compress, block, lzma.FORMAT_XZ, -1, preset)
+        else:
+            level = 9 if self.level is None else self.level
+            self.pipeline.submit(self.handle.write, bz2.compress, block, level)
+
+    def flush(self):
+        return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.buffer or not self.blocks:
+                self._submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            self.pipeline.flush()
+            if self.fmt == "gz":
+                level = -1 if self.level is None else self.level
+                self.handle.write(deflate_final_block(level))
+                self.handle.write(struct.pack("<II", self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF))
+        finally:
+            self.pipeline.close()
+            self.handle.close()
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.pipeline.close(cancel=True)
+        finally:
+            self.handle.close()
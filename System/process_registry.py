@@ -0,0 +1,185 @@
+import os
+import signal
+import subprocess
+import threading
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except Exception:
+    _CLOCK_TICKS = 100
+    _PAGE_SIZE = 4096
+
+_processes = {}
+_totals = {}
+_registry_lock = threading.Lock()
+
+
+class _Entry:
+    def __init__(self, process, kind, grouped):
+        self.process = process
+        self.kind = kind
+        self.grouped = grouped
+        self.cpu_seconds = None
+        self.rss_bytes = None
+        self.peak_rss_bytes = None
+
+
+def process_group_kwargs():
+    if os.name == "nt":
+        return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    return {"start_new_session": True}
+
+
+def _read_usage(pid):
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            times = proc.cpu_times()
+            return times.user + times.system, proc.memory_info().rss
+        except Exception:
+            return None, None
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as handle:
+            fields = handle.read().rsplit(b")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / float(_CLOCK_TICKS)
+        rss = int(fields[21]) * _PAGE_SIZE
+        return cpu, rss
+    except Exception:
+        return None, None
+
+
+def _sample(entry):
+    if entry.process.poll() is not None:
+        return
+    cpu, rss = _read_usage(entry.process.pid)
+    if cpu is not None:
+        entry.cpu_seconds = cpu
+    if rss is not None:
+        entry.rss_bytes = rss
+        entry.peak_rss_bytes = max(entry.peak_rss_bytes or 0, rss)
+
+
+def _kill(entry):
+    proc = entry.process
+    if proc.poll() is not None:
+        return
+    try:
+        if entry.grouped and os.name != "nt":
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif entry.grouped:
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+    except Exception:
+        pass
+    try:
+        proc.kill()
+    except Exception:
+        pass
+
+
+def _retire(task_id, entry):
+    _sample(entry)
+    _kill(entry)
+    with _registry_lock:
+        totals = _totals.setdefault(task_id, {"processes": 0, "cpu_seconds": 0.0, "peak_rss_bytes": 0})
+        totals["processes"] += 1
+        totals["cpu_seconds"] += entry.cpu_seconds or 0.0
+        totals["peak_rss_bytes"] = max(totals["peak_rss_bytes"], entry.peak_rss_bytes or 0)
+
+
+def register_process(task_id, process, kind="ffmpeg", grouped=False):
+    if not task_id or process is None:
+        return False
+    with _registry_lock:
+        entries = _processes.setdefault(task_id, [])
+        if not any(entry.process is process for entry in entries):
+            entries.append(_Entry(process, kind, grouped))
+    return True
+
+
+def release_process(task_id, process):
+    with _registry_lock:
+        entries = _processes.get(task_id) or []
+        entry = next((item for item in entries if item.process is process), None)
+        if entry is not None:
+            entries.remove(entry)
+            if not entries:
+                _processes.pop(task_id, None)
+    if entry is not None:
+        _retire(task_id, entry)
+    else:
+        try:
+            if process.poll() is None:
+                process.kill()
+        except Exception:
+            pass
+
+
+def kill_task_processes(task_id):
+    with _registry_lock:
+        entries = _processes.pop(task_id, [])
+    for entry in entries:
+        _retire(task_id, entry)
+
+
+def kill_all_processes():
+    with _registry_lock:
+        items = list(_processes.items())
+        _processes.clear()
+    for _, entries in items:
+        for entry in entries:
+            _kill(entry)
+
+
+def sample_processes(task_id):
+    with _registry_lock:
+        entries = list(_processes.get(task_id) or [])
+    for entry in entries:
+        _sample(entry)
+
+
+def process_stats(task_id=None):
+    with _registry_lock:
+        if task_id is None:
+            items = [(key, list(entries)) for key, entries in _processes.items()]
+        else:
+            items = [(task_id, list(_processes.get(task_id) or []))]
+    stats = []
+    for key, entries in items:
+        for entry in entries:
+            _sample(entry)
+            stats.append({
+                "task_id": key,
+                "pid": entry.process.pid,
+                "kind": entry.kind,
+                "running": entry.process.poll() is None,
+                "cpu_seconds": None if entry.cpu_seconds is None else round(entry.cpu_seconds, 3),
+                "rss_bytes": entry.rss_bytes,
+                "peak_rss_bytes": entry.peak_rss_bytes
+            })
+    return stats
+
+
+def pop_task_totals(task_id):
+    with _registry_lock:
+        totals = _totals.pop(task_id, None)
+        prefix = f"{task_id}#"
+        for key in [key for key in _totals if str(key).startswith(prefix)]:
+            child = _totals.pop(key)
+            if totals is None:
+                totals = {"processes": 0, "cpu_seconds": 0.0, "peak_rss_bytes": 0}
+            totals["processes"] += child["processes"]
+            totals["cpu_seconds"] += child["cpu_seconds"]
+            totals["peak_rss_bytes"] = max(totals["peak_rss_bytes"], child["peak_rss_bytes"])
+    if totals:
+        totals["cpu_seconds"] = round(totals["cpu_seconds"], 3)
+    return totals
@@ -0,0 +1,129 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+
+from System.process_registry import pop_task_totals
+from System.utils import emit_json
+
+_DEFAULT_TOP = 15
+_SORT_KEYS = {
+    "tottime": 2,
+    "cumulative": 3,
+}
+
+def resolve_profile_options(data, payload=None):
+    raw = data.get("profile") if isinstance(data, dict) else None
+    if raw is None and isinstance(payload, dict):
+        raw = payload.get("profile")
+    if not raw:
+        return None
+    options = raw if isinstance(raw, dict) else {}
+    try:
+        top = int(options.get("top", _DEFAULT_TOP))
+    except Exception:
+        top = _DEFAULT_TOP
+    sort = str(options.get("sort") or "tottime").strip().lower()
+    if sort not in _SORT_KEYS:
+        sort = "tottime"
+    return {
+        "top": max(1, top),
+        "sort": sort,
+        "output": str(options.get("output") or "").strip() or None
+    }
+
+def _resolve_output_path(args, payload):
+    if not isinstance(payload, dict) and args:
+        try:
+            payload = json.loads(args[0])
+        except Exception:
+            payload = None
+    if isinstance(payload, dict):
+        return str(payload.get("output_path") or "").strip() or None
+    return None
+
+def _format_function(key):
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{filename}:{line}({name})"
+
+class TaskProfiler:
+    def __init__(self, task_id, options=None):
+        self.task_id = task_id
+        options = options or {}
+        self.top = options.get("top", _DEFAULT_TOP)
+        self.sort = options.get("sort", "tottime")
+        self.output = options.get("output")
+
+    def _resolve_stats_path(self, args, payload):
+        if self.output:
+            return self.output
+        output_path = _resolve_output_path(args, payload)
+        if output_path:
+            return output_path + ".pstats"
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(self.task_id))
+        return os.path.join(tempfile.gettempdir(), f"pulsar-profile-{safe_id}-{int(time.time())}.pstats")
+
+    def _hotspots(self, stats):
+        index = _SORT_KEYS[self.sort]
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][index], reverse=True)
+        hotspots = []
+        for key, (_, calls, tottime, cumtime, _) in entries[:self.top]:
+            hotspots.append({
+                "function": _format_function(key),
+                "calls": calls,
+                "self_seconds": round(tottime, 6),
+                "cumulative_seconds": round(cumtime, 6)
+            })
+        return hotspots
+
+    def _report(self, profiler, elapsed, run_args):
+        args = run_args[0] if run_args else None
+        payload = run_args[1] if len(run_args) > 1 else None
+        stats = pstats.Stats(profiler)
+        stats_path = self._resolve_stats_path(args, payload)
+        try:
+            stats_dir = os.path.dirname(stats_path)
+            if stats_dir:
+                os.makedirs(stats_dir, exist_ok=True)
+            stats.dump_stats(stats_path)
+        except Exception:
+            stats_path = None
+        emit_json({
+            "type": "profile",
+            "id": self.task_id,
+            "wall_seconds": round(elapsed, 6),
+            "total_calls": stats.total_calls,
+            "sort": self.sort,
+            "stats_path": stats_path,
+            "hotspots": self._hotspots(stats),
+            "child_processes": pop_task_totals(self.task_id)
+        })
+
+    def run(self, target_fn, *run_args):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        enabled = False
+        try:
+            try:
+                profiler.enable()
+                enabled = True
+            except Exception as e:
+                emit_json({
+                    "type": "log",
+                    "level": "warning",
+                    "id": self.task_id,
+                    "message": f"Profiling disabled for this task: {e}"
+                })
+            return target_fn(*run_args)
+        finally:
+            if enabled:
+                profiler.disable()
+                try:
+                    self._report(profiler, time.perf_counter() - start, run_args)
+                except Exception:
+                    pass
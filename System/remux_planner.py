@@ -0,0 +1,234 @@
+import os
+
+from System.extensions import _detect_extension
+from System.media_info import _normalize_codec, ffprobe_media_info, probe_media_info
+
+ANY = "*"
+
+CONTAINER_CODECS = {
+    "mp4": {
+        "video": {"h264", "hevc", "av1", "vp9", "mpeg4", "mpeg2video"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"},
+        "subtitle": {"mov_text"},
+    },
+    "mov": {
+        "video": {"h264", "hevc", "prores", "mjpeg", "mpeg4", "av1"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "pcm_s16le", "pcm_s24le", "pcm_s16be", "pcm_s24be"},
+        "subtitle": {"mov_text"},
+    },
+    "mkv": {"video": {ANY}, "audio": {ANY}, "subtitle": {ANY}},
+    "mka": {"video": set(), "audio": {ANY}, "subtitle": set()},
+    "webm": {
+        "video": {"vp8", "vp9", "av1"},
+        "audio": {"vorbis", "opus"},
+        "subtitle": {"webvtt"},
+    },
+    "avi": {
+        "video": {"mpeg4", "h264", "mjpeg", "msmpeg4v3"},
+        "audio": {"mp3", "ac3", "pcm_s16le"},
+        "subtitle": set(),
+    },
+    "ts": {
+        "video": {"h264", "hevc", "mpeg2video"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "mp2"},
+        "subtitle": {"dvb_subtitle"},
+    },
+    "mp3": {"video": set(), "audio": {"mp3"}, "subtitle": set()},
+    "m4a": {"video": set(), "audio": {"aac", "alac"}, "subtitle": set()},
+    "aac": {"video": set(), "audio": {"aac"}, "subtitle": set()},
+    "flac": {"video": set(), "audio": {"flac"}, "subtitle": set()},
+    "ogg": {"video": set(), "audio": {"vorbis", "opus", "flac"}, "subtitle": set()},
+    "opus": {"video": set(), "audio": {"opus"}, "subtitle": set()},
+    "wav": {"video": set(), "audio": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}, "subtitle": set()},
+}
+
+CONTAINER_ALIASES = {
+    "m4v": "mp4",
+    "3gp": "mp4",
+    "oga": "ogg",
+    "mts": "ts",
+    "m2ts": "ts",
+}
+
+_REENCODE_OPTIONS = (
+    "-vf", "-af", "-filter:v", "-filter:a", "-filter_complex", "-lavfi",
+    "-s", "-r", "-ar", "-ac", "-aspect", "-pix_fmt",
+    "-ss", "-sseof", "-t", "-to", "-frames:v", "-vframes",
+)
+
+_RATE_CONTROL_PREFIXES = ("-b", "-q", "-qscale", "-crf", "-cq", "-qp", "-maxrate", "-minrate", "-bufsize", "-fs")
+
+_CODEC_PREFIXES = ("-c", "-codec")
+
+_CODEC_SHORTHANDS = {"-vcodec": "v", "-acodec": "a", "-scodec": "s"}
+
+_STREAM_TYPES = {"v": "video", "a": "audio", "s": "subtitle"}
+
+_ENCODER_CODECS = {
+    "libx264": "h264", "libx264rgb": "h264", "libopenh264": "h264",
+    "libx265": "hevc", "libkvazaar": "hevc",
+    "libvpx": "vp8", "libvpx-vp9": "vp9",
+    "libaom-av1": "av1", "libsvtav1": "av1", "librav1e": "av1",
+    "libxvid": "mpeg4",
+    "libmp3lame": "mp3", "libshine": "mp3",
+    "libfdk_aac": "aac",
+    "libopus": "opus", "libvorbis": "vorbis",
+}
+
+_KEPT_OPTIONS = ("-metadata", "-map_metadata", "-movflags", "-f")
+
+_STREAM_SELECT_OPTIONS = ("-map", "-an", "-vn", "-sn", "-dn")
+
+
+def _accepts(allowed, codec):
+    return ANY in allowed or codec in allowed
+
+
+def _probe_streams(input_path, ffprobe_path):
+    if ffprobe_path:
+        try:
+            info = ffprobe_media_info(input_path, ffprobe_path)
+            streams = [
+                {"type": stream.get("type"), "codec": stream.get("codec")}
+                for stream in info.get("streams") or []
+                if stream.get("type") in ("video", "audio", "subtitle")
+            ]
+            return streams, True
+        except Exception:
+            pass
+    ext, _ = _detect_extension(input_path)
+    info = probe_media_info(input_path, ext)
+    if not info:
+        return None, False
+    streams = []
+    if info.get("video_codec"):
+        streams.append({"type": "video", "codec": info["video_codec"]})
+    if info.get("audio_codec"):
+        streams.append({"type": "audio", "codec": info["audio_codec"]})
+    return streams, False
+
+
+def _split_args(ffmpeg_args, input_path, output_path):
+    args = [str(arg) for arg in ffmpeg_args]
+    inputs = [i for i in range(len(args) - 1) if args[i] == "-i"]
+    if len(inputs) != 1 or not args:
+        return None
+    index = inputs[0]
+    if os.path.abspath(args[index + 1]) != os.path.abspath(input_path):
+        return None
+    if os.path.abspath(args[-1]) != os.path.abspath(output_path):
+        return None
+    return args[:index], args[index + 2:-1]
+
+
+def _option_base(arg):
+    return arg.split(":", 1)[0]
+
+
+def _encoder_codec(encoder):
+    encoder = str(encoder).lower()
+    if encoder in _ENCODER_CODECS:
+        return _ENCODER_CODECS[encoder]
+    return encoder.split("_", 1)[0]
+
+
+def _requested_codecs(post):
+    requested = []
+    for i, arg in enumerate(post[:-1]):
+        if arg in _CODEC_SHORTHANDS:
+            requested.append((_STREAM_TYPES[_CODEC_SHORTHANDS[arg]], post[i + 1]))
+        elif _option_base(arg) in _CODEC_PREFIXES:
+            spec = arg.split(":", 1)[1] if ":" in arg else ""
+            requested.append((_STREAM_TYPES.get(spec[:1]), post[i + 1]))
+    return requested
+
+
+def _sets_rate_control(post):
+    return any(_option_base(arg) in _RATE_CONTROL_PREFIXES for arg in post)
+
+
+def _only_container_options(args):
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-y", "-n"):
+            i += 1
+            continue
+        if i + 1 >= len(args):
+            return False
+        if _option_base(arg) in _KEPT_OPTIONS:
+            i += 2
+            continue
+        if (arg in _CODEC_SHORTHANDS or _option_base(arg) in _CODEC_PREFIXES) and args[i + 1] == "copy":
+            i += 2
+            continue
+        return False
+    return True
+
+
+def _keeps_source_codecs(post, selected):
+    if _sets_rate_control(post):
+        return False
+    for kind, encoder in _requested_codecs(post):
+        if encoder == "copy":
+            continue
+        if kind is None or kind not in selected or _encoder_codec(encoder) != selected[kind]:
+            return False
+    return True
+
+
+def plan_stream_copy(ffmpeg_args, input_path, output_path, ffprobe_path=None, container_only=False):
+    split = _split_args(ffmpeg_args, input_path, output_path)
+    if split is None:
+        return None
+    pre, post = split
+    if any(arg in _REENCODE_OPTIONS or arg in _STREAM_SELECT_OPTIONS for arg in pre + post):
+        return None
+    if container_only and not _only_container_options(pre + post):
+        return None
+    out_ext = os.path.splitext(output_path)[1].lstrip(".").lower()
+    container = CONTAINER_ALIASES.get(out_ext, out_ext)
+    allowed = CONTAINER_CODECS.get(container)
+    if allowed is None:
+        return None
+
+    streams, complete = _probe_streams(input_path, ffprobe_path)
+    if not streams:
+        return None
+    selected = {}
+    subtitles = False
+    drop_subtitles = False
+    for stream in streams:
+        kind = stream["type"]
+        codec = _normalize_codec(stream.get("codec"))
+        if kind == "subtitle":
+            subtitles = True
+            if not _accepts(allowed["subtitle"], codec):
+                drop_subtitles = True
+            continue
+        if not allowed[kind]:
+            continue
+        if kind in selected:
+            continue
+        if not codec or not _accepts(allowed[kind], codec):
+            return None
+        selected[kind] = codec
+    if not selected:
+        return None
+    if not _keeps_source_codecs(post, selected):
+        return None
+
+    kept = []
+    for i, arg in enumerate(post):
+        if _option_base(arg) in _KEPT_OPTIONS and i + 1 < len(post):
+            kept += [arg, post[i + 1]]
+
+    plan = pre + ["-i", input_path]
+    plan += ["-map", "0:v:0"] if "video" in selected else ["-vn"]
+    plan += ["-map", "0:a:0"] if "audio" in selected else ["-an"]
+    if complete and subtitles and not drop_subtitles and allowed["subtitle"]:
+        plan += ["-map", "0:s?"]
+    else:
+        plan += ["-sn"]
+    plan += ["-dn", "-c", "copy"] + kept + [output_path]
+    return plan
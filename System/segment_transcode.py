@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from System.ffmpeg_runner import FFmpegStderr, kill_ffmpeg_for_task, run_ffmpeg_with_progress
+from System.parallel_compress import resolve_thread_count
+
+MIN_SEGMENT_SECONDS = 30
+MAX_SEGMENTS = 32
+SPLIT_WEIGHT = 5.0
+CONCAT_WEIGHT = 5.0
+AUDIO_WEIGHT = 0.1
+
+_STREAM_SELECT_OPTIONS = ("-map", "-vn", "-an", "-sn", "-dn")
+_TRIM_OPTIONS = ("-ss", "-sseof", "-t", "-to", "-frames:v", "-vframes")
+_DROPPED_OPTIONS = ("-y", "-n")
+
+
+def _split_job_args(ffmpeg_args, input_path, output_path):
+    args = [str(arg) for arg in ffmpeg_args]
+    inputs = [i for i in range(len(args) - 1) if args[i] == "-i"]
+    if len(inputs) != 1 or not args:
+        return None
+    index = inputs[0]
+    if os.path.abspath(args[index + 1]) != os.path.abspath(input_path):
+        return None
+    if os.path.abspath(args[-1]) != os.path.abspath(output_path):
+        return None
+    if any(arg in _TRIM_OPTIONS or arg in _STREAM_SELECT_OPTIONS for arg in args):
+        return None
+    pre = [arg for arg in args[:index] if arg not in _DROPPED_OPTIONS]
+    post = [arg for arg in args[index + 2:-1] if arg not in _DROPPED_OPTIONS]
+    return pre, post
+
+
+def can_segment(ffmpeg_args, input_path, output_path):
+    return _split_job_args(ffmpeg_args, input_path, output_path) is not None
+
+
+def resolve_segment_count(value, duration_seconds):
+    if value in (None, False, "", 0, "0", 1, "1"):
+        return 1
+    if not duration_seconds or duration_seconds <= 0:
+        return 1
+    count = resolve_thread_count("auto" if value is True else value)
+    limit = int(duration_seconds // MIN_SEGMENT_SECONDS)
+    return max(1, min(count, limit, MAX_SEGMENTS))
+
+
+def _elapsed_seconds(data):
+    if not isinstance(data, dict):
+        return None
+    value = data.get("out_time_us")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value) / 1_000_000.0)
+    except Exception:
+        return None
+
+
+class SegmentTranscoder:
+    def __init__(self, task_id, ffmpeg_path, ffmpeg_args, input_path, output_path,
+                 duration_seconds, segments, has_audio=None, on_progress=None):
+        self.task_id = task_id
+        self.ffmpeg_path = ffmpeg_path
+        self.input_path = input_path
+        self.output_path = output_path
+        self.duration = float(duration_seconds)
+        self.segments = segments
+        self.has_audio = has_audio
+        self.on_progress = on_progress
+        self.input_args, self.encode_args = _split_job_args(ffmpeg_args, input_path, output_path)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.elapsed = {}
+        self.temp_dir = None
+
+    def _report(self, key, seconds, weight=1.0):
+        with self.lock:
+            self.elapsed[key] = (min(seconds, self.duration), weight)
+            done = sum(value * w for value, w in self.elapsed.values())
+        total = self.duration * (1.0 + (AUDIO_WEIGHT if self.has_audio is not False else 0.0))
+        percent = SPLIT_WEIGHT + (100.0 - SPLIT_WEIGHT - CONCAT_WEIGHT) * min(1.0, done / total)
+        if self.on_progress:
+            self.on_progress(percent)
+
+    def _run(self, args, on_data=None):
+        if self.stop_event.is_set():
+            raise Exception("Cancelled.")
+        stderr_log = FFmpegStderr()
+
+        def on_progress(data):
+            if on_data:
+                seconds = _elapsed_seconds(data)
+                if seconds is not None:
+                    on_data(seconds)
+
+        ret = run_ffmpeg_with_progress(
+            self.task_id, self.ffmpeg_path, args, on_progress, on_stderr=stderr_log.feed
+        )
+        if ret != 0:
+            raise stderr_log.error("FFmpeg segment transcoding failed.")
+        return stderr_log
+
+    def _split(self):
+        step = self.duration / self.segments
+        times = ",".join(f"{step * i:.3f}" for i in range(1, self.segments))
+        pattern = os.path.join(self.temp_dir, "source_%04d.mkv")
+        self._run([
+            "-hide_banner", "-y", "-i", self.input_path,
+            "-map", "0:v:0", "-an", "-sn", "-dn", "-c", "copy",
+            "-f", "segment", "-segment_times", times, "-reset_timestamps", "1",
+            pattern
+        ], lambda seconds: self.on_progress and self.on_progress(SPLIT_WEIGHT * min(1.0, seconds / self.duration)))
+        chunks = sorted(
+            os.path.join(self.temp_dir, name)
+            for name in os.listdir(self.temp_dir)
+            if name.startswith("source_")
+        )
+        if not chunks:
+            raise Exception("Splitting the input produced no segments.")
+        return chunks
+
+    def _encode_segment(self, index, chunk, threads):
+        output = os.path.join(self.temp_dir, f"encoded_{index:04d}{self.extension}")
+        args = ["-hide_banner", "-y"] + self.input_args + ["-i", chunk] + self.encode_args + ["-an", "-sn", "-dn"]
+        if threads and "-threads" not in self.encode_args:
+            args += ["-threads", str(threads)]
+        self._run(args + [output], lambda seconds: self._report(("video", index), seconds))
+        return output
+
+    def _encode_audio(self):
+        output = os.path.join(self.temp_dir, f"audio{self.extension}")
+        try:
+            self._run(
+                ["-hide_banner", "-y"] + self.input_args + ["-i", self.input_path] + self.encode_args + ["-vn", "-sn", "-dn", output],
+                lambda seconds: self._report("audio", seconds, AUDIO_WEIGHT)
+            )
+        except Exception as e:
+            if self.has_audio is None and "does not contain any stream" in " ".join(getattr(e, "stderr", [])):
+                return None
+            raise
+        return output
+
+    def _concat(self, encoded, audio):
+        list_path = os.path.join(self.temp_dir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as handle:
+            for path in encoded:
+                escaped = path.replace("'", "'\\''")
+                handle.write(f"file '{escaped}'\n")
+        args = ["-hide_banner", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        if audio:
+            args += ["-i", audio, "-map", "0:v", "-map", "1:a"]
+        args += ["-c", "copy", self.output_path]
+        self._run(args)
+
+    def run(self):
+        self.extension = os.path.splitext(self.output_path)[1] or ".mkv"
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.temp_dir = tempfile.mkdtemp(prefix="pulsar-segments-", dir=output_dir or None)
+        pool = None
+        try:
+            chunks = self._split()
+            workers = min(len(chunks) + (0 if self.has_audio is False else 1), resolve_thread_count("auto"))
+            threads = max(1, resolve_thread_count("auto") // max(1, len(chunks)))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pulsar-segment")
+            audio_future = None if self.has_audio is False else pool.submit(self._encode_audio)
+            futures = [pool.submit(self._encode_segment, i, chunk, threads) for i, chunk in enumerate(chunks)]
+            encoded = [future.result() for future in futures]
+            audio = audio_future.result() if audio_future else None
+            pool.shutdown(wait=True)
+            pool = None
+            self._concat(encoded, audio)
+            if self.on_progress:
+                self.on_progress(100.0)
+            return self.output_path
+        finally:
+            self.stop_event.set()
+            if pool is not None:
+                kill_ffmpeg_for_task(self.task_id)
+                pool.shutdown(wait=True)
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
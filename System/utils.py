@@ -16,7 +16,7 @@ class ProgressEmitter:
         self.last_emit = 0.0
         self.start_time = time.monotonic()
 
-    def emit(self, percent, status="processing", force=False, eta_seconds=None):
+    def emit(self, percent, status="processing", force=False, eta_seconds=None, extra=None):
         if percent is None:
             return
         try:
@@ -52,6 +52,8 @@ class ProgressEmitter:
         if eta_payload is not None:
             payload["eta_seconds"] = eta_payload
             payload["eta"] = int(eta_payload)
+        if extra:
+            payload.update(extra)
         emit_json(payload)
         self.last_emit = now
 
@@ -7,6 +7,8 @@ from System.ffmpeg_output_parser import FFMpegOutputParser
 from System.ffmpeg_popen_patch import kill_processes_for_task
 from System.ffmpeg_runner import kill_all_ffmpeg
 from System.killable_thread import KillableThread
+from System.process_registry import pop_task_totals, process_stats
+from System.profiler import TaskProfiler, resolve_profile_options
 from System.utils import emit_json
 
 def setup_windows_job_object():
@@ -211,6 +213,7 @@ def run_task_with_cleanup(task_id, target_fn, *args, **kwargs):
             active_tasks.pop(task_id, None)
         if rate_limited_stdout:
             rate_limited_stdout.clear_task(task_id)
+        pop_task_totals(task_id)
 
 def main():
     global rate_limited_stdout
@@ -224,7 +227,7 @@ def main():
     sys.stdout = rate_limited_stdout
 
     from System.download_handler import DownloadHandler, DownloadMetadataHandler, SearchHandler
-    from System.convert_handler import ConvertMetadataHandler, ConvertHandler
+    from System.convert_handler import ConvertMetadataHandler, ConvertHandler, BatchConvertHandler
     from System.compress_handler import CompressHandler
 
     emit_json({"type": "ready", "message": "Bridge is ready"})
@@ -239,7 +242,7 @@ def main():
                 command = data.get("command")
                 task_id = data.get("id")
 
-                if command in ("download", "metadata_d", "metadata_c", "metadata", "convert", "compress", "search"):
+                if command in ("download", "metadata_d", "metadata_c", "metadata", "convert", "convert_batch", "compress", "search"):
                     if not task_id:
                         emit_json({"type": "error", "message": "No ID provided"})
                         continue
@@ -249,22 +252,32 @@ def main():
 
                     if command == "download":
                         handler = DownloadHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args), daemon=True)
+                        run_args = (args,)
                     elif command in ("metadata_d", "metadata"):
                         handler = DownloadMetadataHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args), daemon=True)
+                        run_args = (args,)
                     elif command == "metadata_c":
                         handler = ConvertMetadataHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args), daemon=True)
+                        run_args = (args, payload)
                     elif command == "convert":
                         handler = ConvertHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args, payload), daemon=True)
+                        run_args = (args, payload)
+                    elif command == "convert_batch":
+                        handler = BatchConvertHandler(task_id)
+                        run_args = (args, payload)
                     elif command == "compress":
                         handler = CompressHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args, payload), daemon=True)
+                        run_args = (args, payload)
                     elif command == "search":
                         handler = SearchHandler(task_id)
-                        t = KillableThread(target=run_task_with_cleanup, args=(task_id, handler.run, args), daemon=True)
+                        run_args = (args,)
+
+                    profile_options = resolve_profile_options(data, payload)
+                    if profile_options:
+                        target_args = (task_id, TaskProfiler(task_id, profile_options).run, handler.run) + run_args
+                    else:
+                        target_args = (task_id, handler.run) + run_args
+                    t = KillableThread(target=run_task_with_cleanup, args=target_args, daemon=True)
 
                     with active_tasks_lock:
                         active_tasks[task_id] = t
@@ -284,6 +297,9 @@ def main():
                     else:
                         emit_json({"type": "error", "message": "Task not found"})
 
+                elif command == "processes":
+                    emit_json({"type": "processes", "id": task_id, "processes": process_stats(task_id)})
+
                 elif command == "exit":
                     break
 